@@ -1,7 +1,6 @@
 # GUI.py
 import os
 import sys
-import json
 import threading
 import tkinter as tk
 from tkinter import messagebox
@@ -186,65 +185,75 @@ class DownloadGUI(tb.Window):
         self.btn_stop.config(state="normal")
         self.label_status.config(text="Downloading...")
 
-        # create downloader
+        # create downloader; the album list is fetched in the download thread
         self.downloader = MonsterSirenDownloader(self.download_path.get())
-        self.total_albums = len(self.downloader.get_albums())
+        self.progress_snapshot = None
+        self.download_error = None
+        self.downloader.progress.subscribe(self.on_progress)
 
         # create download thread and start
-        self.download_thread = threading.Thread(target=self.downloader.run, daemon=True)
+        self.download_thread = threading.Thread(target=self.run_downloader, daemon=True)
         self.download_thread.start()
 
         # play gif animation
         self.animation((self.label_gif_1, self.label_gif_2))
         self.check_thread()  # check download thread status
 
+    def run_downloader(self):
+        """Download thread target; keeps the exception for finish_download."""
+        try:
+            self.downloader.run()
+        except Exception as e:
+            self.download_error = e
+
+    def on_progress(self, snapshot):
+        """Receive a progress snapshot (called from the download thread).
+
+        Only stores the latest snapshot; check_thread draws it on the Tk thread,
+        so bursts of events are coalesced into one redraw.
+        """
+        self.progress_snapshot = snapshot
+
     def check_thread(self):
         """Check download thread status."""
+        self.update_progress()
         if self.download_thread.is_alive():
-            # is downloading -> update progress
-            self.update_progress()
-            # 0.5 sec check once
-            self.after(500, self.check_thread)
-        else:
+            # is downloading -> redraw the latest progress 10 times per second
+            self.after(100, self.check_thread)
+        elif self.is_downloading:
             # download thread is finished
-            self.update_progress()
+            self.finish_download()
 
     def update_progress(self):
-        """Update download progress."""
-        if not self.is_downloading:
+        """Draw the latest progress snapshot."""
+        snapshot, self.progress_snapshot = self.progress_snapshot, None
+        if not self.is_downloading or snapshot is None:
             return
 
-        # count completed albums
-        path_json = Path(self.download_path.get()) / "completed_albums.json"
-        if path_json.exists():
-            try:
-                with open(path_json, "r", encoding="utf-8") as f:
-                    completed_albums = json.load(f)
-                self.completed_count = len(completed_albums)
-            except:
-                self.completed_count = 0
-        else:
-            self.completed_count = 0
+        finished = snapshot["songs_done"] + snapshot["songs_failed"]
+        self.meter.configure(amountused=int(snapshot["fraction"] * 100))
 
-        # update progress bar
-        if self.total_albums > 0:
-            percent = int((self.completed_count / self.total_albums) * 100)
-        else:
-            percent = 0
-
-        self.meter.configure(amountused=percent)
-        self.label_status.config(
-            text=f"{self.completed_count}/{self.total_albums} completed."
-        )
-
-        if percent == 100:
-            self.finish_download()
+        status = f"{finished}/{snapshot['songs_total']} songs"
+        if snapshot["speed"] > 0:
+            status += f", {snapshot['speed'] / 1024 / 1024:.1f} MiB/s"
+        if snapshot["eta"] is not None and finished < snapshot["songs_total"]:
+            minutes, seconds = divmod(int(snapshot["eta"]), 60)
+            status += f", ETA {minutes}:{seconds:02d}"
+        self.label_status.config(text=status)
 
     def finish_download(self):
         """Finish download."""
         self.stop_animation((self.label_gif_1, self.label_gif_2))
-        self.meter.configure(amountused=100)
-        self.label_status.config(text="Completed.")
+        snapshot = self.downloader.progress.snapshot()
+        if self.download_error is not None:
+            self.label_status.config(text=f"Failed: {self.download_error}")
+        elif snapshot["songs_failed"]:
+            self.label_status.config(
+                text=f"Completed, {snapshot['songs_failed']} songs failed."
+            )
+        else:
+            self.meter.configure(amountused=100)
+            self.label_status.config(text="Completed.")
         self.btn_start.config(state="normal")
         self.btn_stop.config(state="disabled")
         self.is_downloading = False
@@ -0,0 +1,108 @@
+"""
+冷啟動效能測試：
+1. 在全新的直譯器中匯入 MonsterSirenDownloader 的時間，以及匯入後已載入的重量級模組；
+2. 對本機的 mock server 完成一次下載後，再從全新的行程執行一次
+   沒有新內容的增量同步（從行程啟動到結束的總時間）。
+
+執行: python -m benchmarks.cold_start [--rounds 5] [--port 8781]
+"""
+
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+import multiprocessing
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from benchmarks.mock_server import serve  # noqa: E402
+
+HEAVY_MODULES = ("aiohttp", "requests", "pydub", "PIL", "mutagen", "tqdm")
+
+IMPORT_SCRIPT = f"""
+import sys, time, json
+started = time.perf_counter()
+import downloader.MonsterSirenDownloader
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+RUN_SCRIPT = """
+import os, sys
+sys.stdout = open(os.devnull, "w")
+from downloader.MonsterSirenDownloader import MonsterSirenDownloader
+downloader = MonsterSirenDownloader(sys.argv[1], max_workers=2, api_base=sys.argv[2])
+downloader.run()
+downloader.stop()
+"""
+
+
+def run_python(script, *args):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", script, *args],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return time.perf_counter() - started, result.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8781)
+    args = parser.parse_args()
+
+    imports = [json.loads(run_python(IMPORT_SCRIPT)[1]) for _ in range(args.rounds)]
+    print(
+        f"import: {statistics.median(i['seconds'] for i in imports) * 1000:.0f} ms "
+        f"(median of {args.rounds}), heavy modules loaded: "
+        f"{', '.join(imports[0]['loaded']) or 'none'}"
+    )
+
+    context = multiprocessing.get_context("spawn")
+    ready = context.Event()
+    server = context.Process(
+        target=serve,
+        kwargs={
+            "ready": ready,
+            "albums": 4,
+            "songs_per_album": 4,
+            "mp3_size": 256 * 1024,
+            "wav_ratio": 0.0,
+            "lyrics_ratio": 0.0,
+            "port": args.port,
+        },
+        daemon=True,
+    )
+    server.start()
+    ready.wait()
+    api_base = f"http://127.0.0.1:{args.port}/api"
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            first, _ = run_python(RUN_SCRIPT, directory, api_base)
+            print(f"first sync: {first:.2f} s")
+            runs = [
+                run_python(RUN_SCRIPT, directory, api_base)[0]
+                for _ in range(args.rounds)
+            ]
+            print(
+                f"no-op sync: {statistics.median(runs):.2f} s "
+                f"(median of {args.rounds}, process start to exit)"
+            )
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
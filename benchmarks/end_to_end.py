@@ -0,0 +1,153 @@
+"""
+端到端效能測試：對本機的 mock server 執行 MonsterSirenDownloader.run，
+比較不同轉檔行程數與檔案大小組合的 songs/s、MB/s、CPU 時間與最高記憶體用量。
+每個情境在獨立的子行程與全新的下載目錄中執行，互不影響。
+
+執行: python -m benchmarks.end_to_end [--workers 1 2 4] [--mix mp3 wav mixed]
+      [--latency 0.02] [--bandwidth 0] [--error-rate 0] [--json result.json]
+需要 ffmpeg；resource 模組僅在 Linux / macOS 提供。
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks.mock_server import serve  # noqa: E402
+
+# 檔案大小組合：(MP3 大小, WAV 大小, WAV 比例)
+MIXES = {
+    "mp3": (1024 * 1024, 0, 0.0),
+    "wav": (0, 8 * 1024 * 1024, 1.0),
+    "mixed": (1024 * 1024, 8 * 1024 * 1024, 0.5),
+}
+
+
+def run_downloader(api_base, workers, concurrency, result):
+    # 在子行程中執行，資源用量只反映這次下載
+    from downloader.MonsterSirenDownloader import MonsterSirenDownloader
+
+    sys.stdout = open(os.devnull, "w")
+    with tempfile.TemporaryDirectory() as directory:
+        downloader = MonsterSirenDownloader(
+            directory,
+            max_workers=workers,
+            max_concurrency=concurrency,
+            api_base=api_base,
+        )
+        started = time.perf_counter()
+        downloader.run()
+        wall = time.perf_counter() - started
+        songs = downloader.state_store.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM songs WHERE status = ?",
+            ("completed",),
+        ).fetchone()
+        downloader.stop()
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss 在 Linux 為 KiB，在 macOS 為 bytes
+    scale = 1 if sys.platform == "darwin" else 1024
+    result.put(
+        {
+            "wall": wall,
+            "songs": songs[0],
+            "bytes": songs[1],
+            "cpu": usage.ru_utime + usage.ru_stime,
+            "children_cpu": children.ru_utime + children.ru_stime,
+            "peak_rss": usage.ru_maxrss * scale,
+            "children_peak_rss": children.ru_maxrss * scale,
+        }
+    )
+
+
+def run_scenario(args, mix, workers, port):
+    mp3_size, wav_size, wav_ratio = MIXES[mix]
+    context = multiprocessing.get_context("spawn")
+    ready = context.Event()
+    server = context.Process(
+        target=serve,
+        kwargs={
+            "ready": ready,
+            "albums": args.albums,
+            "songs_per_album": args.songs_per_album,
+            "mp3_size": int(mp3_size * args.scale),
+            "wav_size": int(wav_size * args.scale),
+            "wav_ratio": wav_ratio,
+            "latency": args.latency,
+            "bandwidth": args.bandwidth or None,
+            "error_rate": args.error_rate,
+            "drop_rate": args.drop_rate,
+            "lyrics_ratio": args.lyrics_ratio,
+            "port": port,
+        },
+        daemon=True,
+    )
+    server.start()
+    ready.wait()
+    try:
+        result = context.Queue()
+        client = context.Process(
+            target=run_downloader,
+            args=(f"http://127.0.0.1:{port}/api", workers, args.concurrency, result),
+        )
+        client.start()
+        metrics = result.get()
+        client.join()
+    finally:
+        server.terminate()
+        server.join()
+    metrics.update(
+        {"mix": mix, "workers": workers, "total": args.albums * args.songs_per_album}
+    )
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--mix", nargs="+", default=list(MIXES), choices=MIXES)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--albums", type=int, default=4)
+    parser.add_argument("--songs-per-album", type=int, default=6)
+    parser.add_argument("--scale", type=float, default=1.0, help="檔案大小倍率")
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--bandwidth", type=float, default=0, help="bytes/秒")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--lyrics-ratio", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--json", help="另存結果為 JSON，方便比較不同版本")
+    args = parser.parse_args()
+
+    header = (
+        f"{'mix':<8}{'workers':>8}{'done':>9}{'songs/s':>9}{'MB/s':>8}"
+        f"{'CPU s':>8}{'+child':>8}{'RSS MB':>8}{'+child':>8}"
+    )
+    print(header)
+    results = []
+    for mix in args.mix:
+        for workers in args.workers:
+            m = run_scenario(args, mix, workers, args.port)
+            results.append(m)
+            print(
+                f"{mix:<8}{workers:>8}{m['songs']:>5}/{m['total']:<3}"
+                f"{m['songs'] / m['wall']:>9.2f}"
+                f"{m['bytes'] / m['wall'] / 1e6:>8.1f}"
+                f"{m['cpu']:>8.2f}{m['children_cpu']:>8.2f}"
+                f"{m['peak_rss'] / 1e6:>8.0f}{m['children_peak_rss'] / 1e6:>8.0f}"
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+本機的 Monster Siren API 替身，提供 /api/albums、/api/album/{cid}/detail、
+/api/song/{cid}，以及合成的 MP3 / WAV / LRC / 封面檔案。
+可設定延遲、每條連線的頻寬與錯誤注入，讓效能測試不必連到真正的網站。
+
+單獨執行: python -m benchmarks.mock_server [--albums 4] [--latency 0.02] ...
+"""
+
+import io
+import time
+import wave
+import random
+import asyncio
+import hashlib
+import argparse
+from aiohttp import web
+from PIL import Image
+
+# MPEG-1 Layer III、128 kbps、44.1 kHz 的 frame 標頭，每個 frame 417 bytes
+MP3_FRAME_HEADER = b"\xff\xfb\x90\x64"
+MP3_FRAME_SIZE = 417
+
+
+def synth_mp3(size, seed):
+    rng = random.Random(seed)
+    frame_body = MP3_FRAME_SIZE - len(MP3_FRAME_HEADER)
+    frames = max(1, size // MP3_FRAME_SIZE)
+    return b"".join(MP3_FRAME_HEADER + rng.randbytes(frame_body) for _ in range(frames))
+
+
+def synth_wav(size, seed):
+    # 16-bit 立體聲雜訊，讓 flac 的壓縮成本接近真實音樂
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(44100)
+        w.writeframes(rng.randbytes(max(4, size - 44) // 4 * 4))
+    return buffer.getvalue()
+
+
+def synth_cover(seed, size=800):
+    image = Image.new("RGB", (size, size), tuple(random.Random(seed).randbytes(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def synth_lyrics(lines=40):
+    return "\n".join(
+        f"[{i // 60:02d}:{i % 60:02d}.00]line {i}" for i in range(lines)
+    ).encode("utf-8")
+
+
+class MockSirenServer:
+    """
+    :param albums: 專輯數量。
+    :param songs_per_album: 每張專輯的歌曲數量。
+    :param mp3_size: MP3 檔案大小（bytes）。
+    :param wav_size: WAV 檔案大小（bytes）。
+    :param wav_ratio: WAV 歌曲所佔比例（0~1），其餘為 MP3。
+    :param lyrics_ratio: 有歌詞的歌曲比例。
+    :param latency: 每個請求在回應前的延遲秒數。
+    :param bandwidth: 每條連線的傳送速度上限（bytes/秒），None 表示不限制。
+    :param error_rate: 請求直接回應 503 的機率。
+    :param drop_rate: 檔案傳送到一半中斷連線的機率。
+    """
+
+    def __init__(
+        self,
+        albums=4,
+        songs_per_album=8,
+        mp3_size=512 * 1024,
+        wav_size=4 * 1024 * 1024,
+        wav_ratio=0.5,
+        lyrics_ratio=0.5,
+        latency=0.0,
+        bandwidth=None,
+        error_rate=0.0,
+        drop_rate=0.0,
+        host="127.0.0.1",
+        port=8780,
+        seed=0,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.rng = random.Random(seed)
+        self.base = f"http://{host}:{port}"
+        self.stats = {"requests": 0, "errors": 0, "drops": 0, "bytes": 0}
+
+        # 相同類型的歌曲共用同一份內容，只有結尾的 16 bytes 依 cid 不同，
+        # 避免產生大量資料，也不會被當成重複的歌曲而略過下載
+        self.files = {
+            "song.mp3": (synth_mp3(mp3_size, seed), "audio/mpeg"),
+            "song.wav": (synth_wav(wav_size, seed), "audio/wav"),
+            "lyric.lrc": (synth_lyrics(), "text/plain"),
+        }
+        self.albums = []
+        self.songs = {}
+        for a in range(albums):
+            album_cid = f"{a:04d}"
+            self.files[f"cover{album_cid}.jpg"] = (synth_cover(a), "image/jpeg")
+            songs = []
+            for s in range(songs_per_album):
+                song_cid = f"{album_cid}{s:02d}"
+                kind = "wav" if self.rng.random() < wav_ratio else "mp3"
+                lyric = self.rng.random() < lyrics_ratio
+                songs.append(
+                    {"cid": song_cid, "name": f"Song {s}", "artistes": ["Mock"]}
+                )
+                self.songs[song_cid] = {
+                    "cid": song_cid,
+                    "name": f"Song {s}",
+                    "albumCid": album_cid,
+                    "sourceUrl": f"{self.base}/files/{song_cid}/song.{kind}",
+                    "lyricUrl": (
+                        f"{self.base}/files/{song_cid}/lyric.lrc" if lyric else None
+                    ),
+                    "artists": ["Mock"],
+                }
+            self.albums.append(
+                {
+                    "cid": album_cid,
+                    "name": f"Album {a}",
+                    "coverUrl": f"{self.base}/files/{album_cid}/cover{album_cid}.jpg",
+                    "artistes": ["Mock"],
+                    "songs": songs,
+                }
+            )
+        self.etags = {
+            name: f'"{hashlib.sha1(data).hexdigest()[:16]}"'
+            for name, (data, _) in self.files.items()
+        }
+        self.runner = None
+
+    def total_bytes(self):
+        return sum(
+            len(self.files[song["sourceUrl"].rsplit("/", 1)[1]][0])
+            for song in self.songs.values()
+        )
+
+    def _payload(self, cid, name):
+        data, content_type = self.files[name]
+        etag = self.etags[name]
+        if name.startswith("song."):
+            tail = hashlib.sha256(cid.encode()).digest()[:16]
+            data = data[: -len(tail)] + tail
+            etag = f'"{etag.strip(chr(34))}-{cid}"'
+        return data, content_type, etag
+
+    def app(self):
+        app = web.Application(middlewares=[self._inject])
+        app.router.add_get("/api/albums", self._albums)
+        app.router.add_get("/api/album/{cid}/detail", self._album_detail)
+        app.router.add_get("/api/song/{cid}", self._song)
+        app.router.add_get("/files/{cid}/{name}", self._file)
+        return app
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app())
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        return f"{self.base}/api"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    @web.middleware
+    async def _inject(self, request, handler):
+        self.stats["requests"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return web.Response(status=503, headers={"Retry-After": "0"})
+        return await handler(request)
+
+    async def _albums(self, request):
+        data = [
+            {key: album[key] for key in ("cid", "name", "coverUrl", "artistes")}
+            for album in self.albums
+        ]
+        return web.json_response({"code": 0, "msg": "", "data": data})
+
+    async def _album_detail(self, request):
+        cid = request.match_info["cid"]
+        for album in self.albums:
+            if album["cid"] == cid:
+                return web.json_response({"code": 0, "msg": "", "data": album})
+        raise web.HTTPNotFound()
+
+    async def _song(self, request):
+        song = self.songs.get(request.match_info["cid"])
+        if song is None:
+            raise web.HTTPNotFound()
+        return web.json_response({"code": 0, "msg": "", "data": song})
+
+    async def _file(self, request):
+        name = request.match_info["name"]
+        if name not in self.files:
+            raise web.HTTPNotFound()
+        data, content_type, etag = self._payload(request.match_info["cid"], name)
+        headers = {
+            "Content-Type": content_type,
+            "Accept-Ranges": "bytes",
+            "ETag": etag,
+        }
+
+        start, end, status = 0, len(data) - 1, 200
+        range_header = request.headers.get("Range")
+        if_range = request.headers.get("If-Range")
+        if range_header and (if_range is None or if_range == etag):
+            first, _, last = range_header.removeprefix("bytes=").partition("-")
+            start = int(first)
+            end = min(int(last), end) if last else end
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        headers["Content-Length"] = str(end - start + 1)
+
+        if request.method == "HEAD":
+            return web.Response(status=status, headers=headers)
+
+        response = web.StreamResponse(status=status, headers=headers)
+        await response.prepare(request)
+        body = memoryview(data)[start : end + 1]
+        drop_at = (
+            self.rng.randrange(len(body))
+            if self.drop_rate and self.rng.random() < self.drop_rate
+            else None
+        )
+        chunk = 64 * 1024
+        started = time.monotonic()
+        for offset in range(0, len(body), chunk):
+            if drop_at is not None and offset >= drop_at:
+                self.stats["drops"] += 1
+                request.transport.close()
+                return response
+            await response.write(body[offset : offset + chunk])
+            self.stats["bytes"] += min(chunk, len(body) - offset)
+            if self.bandwidth:
+                # 依已送出的量控制速度
+                delay = (offset + chunk) / self.bandwidth - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        await response.write_eof()
+        return response
+
+
+def serve(ready=None, **options):
+    """在目前的行程中執行伺服器直到被終止；ready 為選填的 multiprocessing.Event。"""
+
+    async def main():
+        server = MockSirenServer(**options)
+        await server.start()
+        if ready is not None:
+            ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--albums", type=int, default=4)
+    parser.add_argument("--songs-per-album", type=int, default=8)
+    parser.add_argument("--mp3-size", type=int, default=512 * 1024)
+    parser.add_argument("--wav-size", type=int, default=4 * 1024 * 1024)
+    parser.add_argument("--wav-ratio", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--lyrics-ratio", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=8780)
+    args = parser.parse_args()
+    print(f"Mock API: http://127.0.0.1:{args.port}/api")
+    serve(**{key: value for key, value in vars(args).items()})
+
+
+if __name__ == "__main__":
+    main()
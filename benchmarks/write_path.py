@@ -0,0 +1,120 @@
+"""
+比較 download_file 寫入路徑的 CPU 成本：
+舊版每 1 KiB 寫入一次並更新進度、檢查停止旗標，
+新版以大區塊讀取、合併寫入並依時間節流。
+
+執行: python -m benchmarks.write_path [--size-mb 64] [--rounds 3]
+"""
+
+import io
+import sys
+import time
+import queue
+import asyncio
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+from tqdm import tqdm
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from downloader.DownloadWorker import DownloadWorker  # noqa: E402
+from downloader.HttpClient import HttpClient  # noqa: E402
+
+HOST = "127.0.0.1"
+PORT = 8766
+
+
+def serve(size, ready):
+    payload = b"\x5a" * size
+
+    async def handler(request):
+        return web.Response(body=payload, content_type="audio/wav")
+
+    app = web.Application()
+    app.router.add_get("/payload", handler)
+
+    async def main():
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, HOST, PORT).start()
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+async def legacy_write(worker, response, f, bar):
+    async for data in response.content.iter_chunked(1024):
+        if worker.stop_event.is_set():
+            raise InterruptedError
+        f.write(data)
+        bar.update(len(data))
+
+
+async def current_write(worker, response, f, bar):
+    await worker._write_response(response, f, "payload", bar)
+
+
+async def measure(worker, write, read_bufsize, path, rounds):
+    url = f"http://{HOST}:{PORT}/payload"
+    cpu_times, wall_times = [], []
+    async with aiohttp.ClientSession(read_bufsize=read_bufsize) as session:
+        for _ in range(rounds):
+            cpu, wall = time.process_time(), time.perf_counter()
+            async with session.get(url) as response:
+                with open(path, "wb") as f, tqdm(
+                    total=response.content_length, file=io.StringIO()
+                ) as bar:
+                    await write(worker, response, f, bar)
+            cpu_times.append(time.process_time() - cpu)
+            wall_times.append(time.perf_counter() - wall)
+    return min(cpu_times), min(wall_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    size = args.size_mb * 1024 * 1024
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(size, ready), daemon=True)
+    server.start()
+    ready.wait()
+
+    with tempfile.TemporaryDirectory() as directory:
+        worker = DownloadWorker(
+            Path(directory),
+            threading.Event(),
+            None,
+            None,
+            HttpClient(),
+            queue.Queue(),
+        )
+        path = Path(directory) / "payload.tmp"
+        cases = [
+            ("iter_chunked(1024)", legacy_write, 2**16),
+            ("iter_any + 合併寫入", current_write, HttpClient.READ_BUFSIZE),
+        ]
+        print(f"檔案大小: {args.size_mb} MiB，取 {args.rounds} 次中的最佳值")
+        print(f"{'寫入路徑':<24}{'CPU (ms)':>12}{'牆鐘 (ms)':>12}{'MiB/s':>10}")
+        for name, write, read_bufsize in cases:
+            cpu, wall = asyncio.run(
+                measure(worker, write, read_bufsize, path, args.rounds)
+            )
+            print(
+                f"{name:<24}{cpu * 1000:>12.1f}{wall * 1000:>12.1f}"
+                f"{args.size_mb / wall:>10.1f}"
+            )
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
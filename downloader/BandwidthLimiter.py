@@ -0,0 +1,34 @@
+import time
+import asyncio
+
+
+class BandwidthLimiter:
+    """
+    所有傳輸共用的頻寬上限（token bucket）。讀取一塊資料後扣除等量的額度，
+    額度不足時暫停讀取，由 TCP 的流量控制讓伺服器放慢傳送。
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: 每秒允許的 bytes 數。
+        :param burst: 可累積的最大額度，預設為一秒的量。
+        """
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = None
+
+    async def consume(self, size):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        # 依序等待，避免多個傳輸同時搶同一筆額度
+        async with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= size
+            if self.tokens < 0:
+                await asyncio.sleep(-self.tokens / self.rate)
@@ -0,0 +1,140 @@
+from .my_logger import get_mp_child_logger
+import time
+import asyncio
+
+
+class ConcurrencyController:
+    """
+    AIMD 式的傳輸並行數控制，可取代固定大小的 asyncio.Semaphore：
+    每個觀察區間內若收到 429 / 5xx 或連線錯誤就把上限乘上 backoff；
+    延遲明顯高於基準時上限減一；並行數已用滿且吞吐量沒有下降時上限加一。
+    第一次減少之前處於慢啟動，上限每次加倍，幾個區間內即可從下限升到上限。
+    """
+
+    def __init__(
+        self,
+        min_limit=4,
+        max_limit=64,
+        initial=None,
+        interval=2.0,
+        backoff=0.5,
+        latency_tolerance=2.0,
+        name=None,
+        log_queue=None,
+    ):
+        """
+        :param min_limit: 並行數下限。
+        :param max_limit: 並行數上限。
+        :param initial: 起始並行數，預設為下限。
+        :param interval: 每隔幾秒依觀察結果調整一次。
+        :param backoff: 遇到節流或錯誤時上限乘上的比例。
+        :param latency_tolerance: 平均回應延遲超過基準的幾倍視為壅塞。
+        :param name: 日誌中顯示的名稱，例如主機名稱。
+        :param log_queue: 日誌佇列。
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial or self.min_limit, self.min_limit), self.max_limit)
+        self.interval = interval
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.name = name
+        self.slow_start = True
+        self.logger = get_mp_child_logger(log_queue, name=__name__)
+
+        self.in_flight = 0
+        self.condition = None
+        self.base_latency = None
+        self.last_throughput = 0
+        self._reset_window(time.monotonic())
+
+    def _reset_window(self, now):
+        self.window_start = now
+        self.window_bytes = 0
+        self.window_latency = 0.0
+        self.window_responses = 0
+        self.window_throttled = 0
+        self.window_peak = self.in_flight
+
+    async def __aenter__(self):
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            self.window_peak = max(self.window_peak, self.in_flight)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+    def record_response(self, status, latency):
+        """
+        :param status: HTTP 狀態碼，連線失敗時為 None。
+        :param latency: 從送出請求到收到回應標頭的秒數。
+        """
+        if status is None or status == 429 or status >= 500:
+            self.window_throttled += 1
+        else:
+            self.window_responses += 1
+            self.window_latency += latency
+        self._maybe_adjust()
+
+    def record_bytes(self, size):
+        self.window_bytes += size
+        self._maybe_adjust()
+
+    def _maybe_adjust(self):
+        now = time.monotonic()
+        elapsed = now - self.window_start
+        if elapsed < self.interval:
+            return
+
+        limit = self.limit
+        throughput = self.window_bytes / elapsed
+        latency = (
+            self.window_latency / self.window_responses
+            if self.window_responses
+            else None
+        )
+        if latency is not None:
+            self.base_latency = (
+                latency
+                if self.base_latency is None
+                else min(self.base_latency, latency)
+            )
+
+        if self.window_throttled:
+            limit = int(limit * self.backoff)
+            self.slow_start = False
+            reason = f"收到 {self.window_throttled} 次節流或錯誤回應"
+        elif latency and latency > self.base_latency * self.latency_tolerance:
+            limit -= 1
+            self.slow_start = False
+            reason = f"回應延遲升高至 {latency * 1000:.0f} ms"
+        elif self.window_peak >= limit and throughput >= self.last_throughput * 0.9:
+            limit = limit * 2 if self.slow_start else limit + 1
+            reason = f"吞吐量 {throughput / 1024 / 1024:.1f} MiB/s"
+        else:
+            reason = None
+
+        self.last_throughput = throughput
+        self._reset_window(now)
+        self._set_limit(limit, reason)
+
+    def _set_limit(self, limit, reason):
+        limit = min(max(limit, self.min_limit), self.max_limit)
+        if limit == self.limit:
+            return
+        name = f" {self.name}" if self.name else ""
+        self.logger.info(f"調整並行傳輸數{name}: {self.limit} -> {limit}（{reason}）")
+        grown = limit > self.limit
+        self.limit = limit
+        if grown and self.condition is not None:
+            asyncio.get_running_loop().create_task(self._wake())
+
+    async def _wake(self):
+        async with self.condition:
+            self.condition.notify_all()
@@ -0,0 +1,68 @@
+import io
+
+
+class CoverArt:
+    """
+    每張專輯只處理一次的封面：保存 bytes、MIME 類型與尺寸，
+    之後每首歌直接嵌入，不再讀檔或重新解碼。
+    """
+
+    MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png"}
+    EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png"}
+    DEPTHS = {"1": 1, "L": 8, "P": 8, "RGB": 24, "RGBA": 32, "CMYK": 32}
+
+    def __init__(self, data, mime, width, height, depth):
+        self.data = data
+        self.mime = mime
+        self.width = width
+        self.height = height
+        self.depth = depth
+
+    @property
+    def extension(self):
+        return self.EXTENSIONS.get(self.mime, ".img")
+
+    @classmethod
+    def from_bytes(cls, raw, cover_format="png", max_size=None):
+        """
+        :param raw: 下載的原始封面 bytes。
+        :param cover_format: "original" 直接沿用原始檔（通常為 JPEG），"png" 轉為 PNG。
+        :param max_size: 嵌入用封面的最長邊（像素），None 表示不縮圖。
+        :return: (存檔用的 CoverArt, 嵌入用的 CoverArt)
+        """
+        from PIL import Image
+
+        with Image.open(io.BytesIO(raw)) as img:
+            if cover_format == "original" and img.format in cls.MIME_TYPES:
+                cover = cls(
+                    raw,
+                    cls.MIME_TYPES[img.format],
+                    img.width,
+                    img.height,
+                    cls.DEPTHS.get(img.mode, 24),
+                )
+                image_format = img.format
+            else:
+                cover = cls._encode(img, "PNG")
+                image_format = "PNG"
+
+            if max_size is None or max(img.size) <= max_size:
+                return cover, cover
+
+            thumbnail = img.copy()
+            thumbnail.thumbnail((max_size, max_size))
+            return cover, cls._encode(thumbnail, image_format)
+
+    @classmethod
+    def _encode(cls, img, image_format):
+        if image_format == "JPEG" and img.mode not in ("RGB", "L", "CMYK"):
+            img = img.convert("RGB")
+        buffer = io.BytesIO()
+        img.save(buffer, format=image_format)
+        return cls(
+            buffer.getvalue(),
+            cls.MIME_TYPES[image_format],
+            img.width,
+            img.height,
+            cls.DEPTHS.get(img.mode, 24),
+        )
@@ -0,0 +1,152 @@
+from .my_logger import get_mp_child_logger
+from .LibraryIndex import LibraryIndex
+import os
+import json
+import asyncio
+
+
+class DownloadPlanner:
+    """
+    不下載任何音訊的試算模式：解析待處理的專輯、歌曲與來源網址，
+    並行送出 HEAD 取得大小與類型，估算需要下載的 bytes、轉檔數量與所需時間。
+    API 回應經過 ResponseCache，定期執行時大多不需重新請求。
+    """
+
+    # 單一 CPU 核心 wav 轉 flac 的處理速度（bytes/秒，以輸入的 wav 計）
+    TRANSCODE_RATE = 16 * 1024 * 1024
+
+    def __init__(self, worker, log_queue=None):
+        """
+        :param worker: 提供 HTTP 客戶端、API 快取與目錄掃描結果的 DownloadWorker。
+        :param log_queue: 日誌佇列。
+        """
+        self.worker = worker
+        self.logger = get_mp_child_logger(log_queue, name=__name__)
+
+    async def plan(self, albums, bandwidth=None, cores=None):
+        """
+        :param albums: 待處理的專輯列表（compare_ablums 的結果）。
+        :param bandwidth: 估算用的下載頻寬（bytes/秒），None 表示不估算下載時間。
+        :param cores: 估算用的轉檔核心數，預設為 DownloadWorker 的轉檔行程數。
+        :return: 統計結果的 dict。
+        """
+        await self.worker.client.open()
+        try:
+            albums_songs = await asyncio.gather(
+                *(self._plan_album(album) for album in albums)
+            )
+        finally:
+            await self.worker.client.aclose()
+
+        songs = [song for album_songs in albums_songs for song in album_songs]
+        actions = [song["action"] for song in songs]
+        download_bytes = sum(song["bytes"] or 0 for song in songs)
+        transcode_bytes = sum(song["size"] or 0 for song in songs if song["transcode"])
+        cores = cores or self.worker.max_workers
+        download_seconds = download_bytes / bandwidth if bandwidth else None
+        transcode_seconds = transcode_bytes / (self.TRANSCODE_RATE * cores)
+        # 下載與轉檔在管線中同時進行，整體時間取決於較慢的一方
+        eta_seconds = (
+            max(download_seconds, transcode_seconds)
+            if download_seconds is not None
+            else None
+        )
+        return {
+            "albums": len(albums),
+            "songs": len(songs),
+            "skip": actions.count(LibraryIndex.SKIP),
+            "retag": actions.count(LibraryIndex.RELOCATE),
+            "reuse": actions.count(LibraryIndex.REUSE),
+            "resume": actions.count(LibraryIndex.RESUME),
+            "download": actions.count(LibraryIndex.DOWNLOAD),
+            "unknown_size": sum(1 for song in songs if song["bytes"] is None),
+            "download_bytes": download_bytes,
+            "transcodes": sum(1 for song in songs if song["transcode"]),
+            "transcode_bytes": transcode_bytes,
+            "bandwidth": bandwidth,
+            "cores": cores,
+            "download_seconds": download_seconds,
+            "transcode_seconds": transcode_seconds,
+            "eta_seconds": eta_seconds,
+        }
+
+    async def _plan_album(self, album_data):
+        worker = self.worker
+        album_url = f"{worker.api_base}/album/{album_data['cid']}/detail"
+        try:
+            songs_data = (await worker.fetch_json(album_url))["data"]["songs"]
+        except Exception as e:
+            self.logger.exception(f"取得專輯資料失敗: {album_data['name']} - {e}")
+            return []
+        album_directory = worker.directory / worker.make_valid(album_data["name"])
+        return await asyncio.gather(
+            *(
+                self._plan_song(album_directory, index + 1, song_data)
+                for index, song_data in enumerate(songs_data)
+            )
+        )
+
+    async def _plan_song(self, album_directory, tracknumber, song_data):
+        worker = self.worker
+        song_name = worker.make_valid(song_data["name"])
+        plan = {"action": LibraryIndex.DOWNLOAD, "size": None, "bytes": None}
+        plan["transcode"] = False
+        if worker.library_index is not None:
+            plan["action"], _ = worker.library_index.plan_song(
+                album_directory, song_name, song_data["cid"], tracknumber
+            )
+            if plan["action"] in (LibraryIndex.SKIP, LibraryIndex.RELOCATE):
+                plan["bytes"] = 0
+                return plan
+
+        try:
+            song_url = f"{worker.api_base}/song/{song_data['cid']}"
+            source_url = (await worker.fetch_json(song_url))["data"]["sourceUrl"]
+
+            async def head():
+                async with worker.client.request(
+                    "HEAD", source_url, allow_redirects=True
+                ) as response:
+                    response.raise_for_status()
+                    return response.headers
+
+            headers = await worker.retry_policy.run(head, source_url, self.logger)
+        except Exception as e:
+            self.logger.warning(f"無法取得歌曲大小: {song_data['name']} - {e}")
+            return plan
+
+        duplicate = worker.state_store.find_completed_song(source_url=source_url)
+        if (
+            duplicate
+            and duplicate["etag"]
+            and duplicate["etag"] == headers.get("etag")
+            and (worker.directory / duplicate["path"]).is_file()
+        ):
+            plan["action"] = LibraryIndex.REUSE
+            plan["bytes"] = 0
+            return plan
+
+        size = int(headers.get("content-length", 0)) or None
+        plan["size"] = size
+        plan["bytes"] = size
+        plan["transcode"] = headers.get("content-type") != "audio/mpeg"
+        if plan["action"] == LibraryIndex.RESUME and size:
+            plan["bytes"] = max(
+                0, size - self._resumed_bytes(album_directory, song_name)
+            )
+        return plan
+
+    @staticmethod
+    def _resumed_bytes(album_directory, song_name):
+        # 依暫存檔與續傳資訊計算已下載的 bytes
+        file_path = album_directory / f"{song_name}.tmp"
+        try:
+            with open(f"{file_path}.json", "r", encoding="utf-8") as f:
+                partial = json.load(f)
+            if partial.get("preallocated"):
+                return 0
+            if partial.get("segments"):
+                return sum(segment[2] for segment in partial["segments"])
+            return os.path.getsize(file_path) - partial.get("base", 0)
+        except (OSError, ValueError):
+            return 0
@@ -1,199 +1,1265 @@
 import os
 import sys
 import json
-from PIL import Image
-import requests
-from tqdm import tqdm
+import time
+import shutil
+import asyncio
+import signal
+import hashlib
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from .my_logger import get_mp_child_logger
 from .MetadataManager import MetadataManager
-from pydub import AudioSegment
+from .StateStore import StateStore
+from .LibraryIndex import LibraryIndex
+from .CoverArt import CoverArt
+from .RetryPolicy import RetryPolicy
+from .ProgressTracker import ProgressTracker
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 沒有 fcntl，clone_file 直接複製
+    fcntl = None
+
+API_BASE = "https://monster-siren.hypergryph.com/api"
+# Linux 的 reflink ioctl（_IOW(0x94, 9, int)）
+FICLONE = 0x40049409
+
+
+class RemoteFileChangedError(Exception):
+    """續傳時遠端檔案已與暫存檔不符，需要從頭重新下載。"""
+
+
+class StalledTransferError(Exception):
+    """傳輸速度長時間低於下限，視為卡住的連線。"""
+
+
+def start_transcode_process(pid_queue):
+    # 轉檔行程自成一個行程群組，停止時可連同 ffmpeg 子行程一起結束；
+    # 並回報自己的 pid，主行程不必讀取 ProcessPoolExecutor 的內部狀態
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    pid_queue.put(os.getpid())
+
+
+def convert_wav_to_flac(wav_path, flac_path, tag_reserve=0):
+    # 在獨立行程中執行，避免 CPU 密集的轉檔阻塞事件迴圈；
+    # pydub 只在轉檔行程中載入，不拖慢主程式啟動
+    from pydub import AudioSegment
+
+    # 先寫入 .part 再改名，轉檔中途被結束時不會留下不完整的 flac
+    part_path = f"{flac_path}.part"
+    parameters = None
+    ffmeta_path = f"{flac_path}.ffmeta"
+    if tag_reserve:
+        # 預留標籤空間，之後寫入封面與歌詞不需重寫整個文件
+        MetadataManager.write_reserve_ffmetadata(ffmeta_path, tag_reserve)
+        parameters = ["-f", "ffmetadata", "-i", ffmeta_path, "-map_metadata", "1"]
+    try:
+        wav_file = AudioSegment.from_wav(str(wav_path))
+        wav_file.export(part_path, format="flac", parameters=parameters)
+        os.replace(part_path, flac_path)
+    finally:
+        if tag_reserve:
+            os.remove(ffmeta_path)
+    os.remove(wav_path)
+    return flac_path
+
+
+def clone_file(src, dst):
+    """
+    複製已完成的歌曲給另一張專輯使用。支援 reflink 的檔案系統（btrfs、XFS 等）
+    只複製索引、共用資料區塊，其餘情況退回一般複製。
+    不使用 hardlink：兩個路徑共用同一份內容時，寫入其中一張專輯的標籤會改到另一張。
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    temp_path = f"{dst}.part"
+    try:
+        with open(src, "rb") as s, open(temp_path, "wb") as d:
+            try:
+                if fcntl is None:
+                    raise OSError("reflink 不支援")
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            except OSError:
+                shutil.copyfileobj(s, d, 1024 * 1024)
+        os.replace(temp_path, dst)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class AlbumJob:
+    """專輯層級的完成追蹤：封面只下載一次，最後一首歌完成時才標記專輯完成。"""
+
+    def __init__(self, album_data, album_directory, song_count, cover=None):
+        self.album_data = album_data
+        self.album_directory = album_directory
+        self.cover = cover
+        self.remaining = song_count
+        self.failed = False
+        self.interrupted = False
+        self.done = asyncio.get_running_loop().create_future()
+
+
+class SongJob:
+    """在管線各階段之間傳遞的單首歌曲狀態。"""
+
+    def __init__(self, album_job, song_data):
+        self.album_job = album_job
+        self.song_data = song_data
+        self.progress_key = None
+        self.song_name = None
+        self.source_url = None
+        self.lyric_url = None
+        self.duplicate = None
+        self.downloaded = None
+        self.file_path = None
+        self.lyrics = None
+
+
+class DownloadedFile:
+    """download_file 的結果：暫存檔與來源內容的資訊。"""
+
+    def __init__(self, path, content_type, size, checksum, base=0, etag=None):
+        """
+        :param path: 暫存檔路徑。
+        :param content_type: 來源的 content-type。
+        :param size: 來源內容的 bytes 數。
+        :param checksum: 來源內容的 sha256。
+        :param base: 來源內容在暫存檔中的起始位置（之前為預留的標籤空間）。
+        :param etag: 來源的 ETag。
+        """
+        self.path = path
+        self.content_type = content_type
+        self.size = size
+        self.checksum = checksum
+        self.base = base
+        self.etag = etag
 
 
 class DownloadWorker:
-    def __init__(self, directory, stop_event, mutex):
+    # 寫入路徑的調校參數：合併寫入的緩衝區大小、進度更新與停止檢查的最短間隔（秒）
+    WRITE_BUFFER_SIZE = 1024 * 1024
+    PROGRESS_INTERVAL = 0.2
+    # stall_timeout 秒內平均速度低於此值（bytes/秒）即中斷重試
+    STALL_MIN_SPEED = 1024
+
+    def __init__(
+        self,
+        directory,
+        stop_event,
+        state_store,
+        response_cache,
+        http_client,
+        log_queue,
+        library_index=None,
+        api_base=API_BASE,
+        max_workers=None,
+        segments=4,
+        min_segment_size=8 * 1024 * 1024,
+        tag_workers=4,
+        metadata_workers=16,
+        stream_transcode=False,
+        cover_format="png",
+        cover_max_size=None,
+        stall_timeout=60,
+        retries=4,
+        hedge_delay=None,
+        progress=None,
+        lyrics_sidecar=True,
+    ):
+        """
+        :param directory: 下載根目錄。
+        :param stop_event: 停止事件，設置後所有傳輸會盡快中斷。
+        :param state_store: 記錄下載狀態的 StateStore。
+        :param response_cache: API 回應的 ResponseCache。
+        :param http_client: 共用的 HttpClient，決定連線池、並行數與頻寬上限；
+                            各階段的指標記錄在它的 Metrics。
+        :param log_queue: 日誌佇列。
+        :param library_index: 已掃描的 LibraryIndex，用來逐首略過已存在的歌曲；
+                              None 表示全部重新處理。
+        :param api_base: API 的根網址。
+        :param max_workers: wav 轉 flac 的行程數（預設為 CPU 核心數）。
+        :param segments: 支援 Range 的大型文件最多拆成幾段並行下載，1 表示停用。
+        :param min_segment_size: 每段最小的 bytes 數，文件太小時會減少段數。
+        :param tag_workers: 同時寫入元數據的數量。
+        :param metadata_workers: 同時查詢歌曲詳細資料（下載網址）的數量。
+        :param stream_transcode: 下載 wav 時直接串流給 ffmpeg 轉為 flac，
+                                 不寫入 wav 暫存檔（此模式無法續傳）。
+        :param cover_format: "png" 將封面轉為 PNG；"original" 直接沿用原始 JPEG。
+        :param cover_max_size: 嵌入歌曲的封面最長邊（像素），None 表示原尺寸嵌入。
+        :param stall_timeout: 傳輸中的速度持續低於 STALL_MIN_SPEED 多少秒視為卡住。
+        :param retries: 暫時性錯誤（逾時、連線中斷、429、5xx）的重試次數。
+        :param hedge_delay: API 請求超過此秒數未完成時再送出一個相同請求，
+                            取先完成者；None 表示停用。
+        :param progress: 接收每首歌進度事件的 ProgressTracker。
+        :param lyrics_sidecar: 是否另存歌詞為與歌曲同名的 .lrc 文件；
+                               不論是否另存，歌詞都會寫入標籤。
+        """
         self.directory = directory
         self.stop_event = stop_event
-        self.mutex = mutex
+        self.state_store = state_store
+        self.response_cache = response_cache
+        self.client = http_client
+        self.metrics = http_client.metrics
+        self.log_queue = log_queue
+        self.library_index = library_index
+        self.api_base = api_base
+        self.max_workers = max_workers or os.cpu_count()
+        self.segments = segments
+        self.min_segment_size = min_segment_size
+        self.tag_workers = tag_workers
+        self.metadata_workers = metadata_workers
+        self.stream_transcode = stream_transcode
+        self.cover_format = cover_format
+        self.cover_max_size = cover_max_size
+        self.stall_timeout = stall_timeout
+        self.retry_policy = RetryPolicy(
+            attempts=retries + 1, retryable=(StalledTransferError,)
+        )
+        self.hedge_delay = hedge_delay
+        self.progress = progress or ProgressTracker()
+        self.lyrics_sidecar = lyrics_sidecar
+        self.logger = get_mp_child_logger(self.log_queue, name=__name__)
+
+        self.executor = None
+        # 轉檔行程啟動時回報的 pid
+        self.pid_queue = None
+        self.transcode_pids = set()
+        # 進行中的 wav 轉檔（目標 flac 路徑），停止時用來清理未完成的輸出
+        self.transcoding = set()
+
+    async def __aenter__(self):
+        await self.client.open()
+        # SimpleQueue 的 put 直接寫入管線，pid 在轉檔行程接受工作前就可讀取
+        self.pid_queue = multiprocessing.SimpleQueue()
+        self.transcode_pids = set()
+        self.executor = ProcessPoolExecutor(
+            self.max_workers,
+            initializer=start_transcode_process,
+            initargs=(self.pid_queue,),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.client.aclose()
+        if exc_type is not None or self.stop_event.is_set():
+            self._kill_executor()
+        else:
+            self.executor.shutdown(wait=True)
+        self.pid_queue.close()
+
+    def _kill_executor(self):
+        # 停止時不等待進行中的轉檔，直接結束轉檔行程與其 ffmpeg；
+        # 已下載完成的 .tmp 與續傳資訊會保留，下次執行直接轉檔
+        while not self.pid_queue.empty():
+            self.transcode_pids.add(self.pid_queue.get())
+        for pid in self.transcode_pids:
+            try:
+                if hasattr(os, "killpg"):
+                    os.killpg(pid, signal.SIGKILL)
+                else:
+                    # Windows 沒有行程群組，SIGTERM 會以 TerminateProcess 結束
+                    os.kill(pid, signal.SIGTERM)
+            except OSError:
+                # 行程已經結束
+                pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for flac_path in self.transcoding:
+            for suffix in (".part", ".ffmeta"):
+                flac_path.with_name(f"{flac_path.name}{suffix}").unlink(missing_ok=True)
+        if self.transcode_pids:
+            self.logger.warning(f"已結束 {len(self.transcode_pids)} 個轉檔行程")
+
+    async def fetch_json(self, url):
+        cached = self.response_cache.get(url)
+        if self.response_cache.is_fresh(cached):
+            self.metrics.inc("api_cache_hits_total")
+            return json.loads(cached["body"])
+
+        headers = {"Accept": "application/json"}
+        headers.update(self.response_cache.revalidation_headers(cached))
+        with self.metrics.track("api"):
+            body = await self.retry_policy.run(
+                lambda: self._hedged(lambda: self._fetch_body(url, headers, cached)),
+                url,
+                self.logger,
+            )
+        return json.loads(body)
+
+    async def _fetch_body(self, url, headers, cached):
+        async with self.client.request("GET", url, headers=headers) as response:
+            if response.status == 304 and cached:
+                self.response_cache.touch(url)
+                return cached["body"]
+            response.raise_for_status()
+            body = await response.read()
+        self.response_cache.put(url, body, response.headers)
+        return body
 
-    def download_album(self, album_data):
+    async def _hedged(self, function):
+        # 第一個請求太慢時再送一個相同請求，取先成功者並取消另一個
+        if not self.hedge_delay:
+            return await function()
+        tasks = [asyncio.ensure_future(function())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay)
+            if not done:
+                tasks.append(asyncio.ensure_future(function()))
+            error = None
+            for task in asyncio.as_completed(tasks):
+                try:
+                    return await task
+                except Exception as e:
+                    error = e
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def fetch_bytes(self, url):
+        async def fetch():
+            async with self.client.request("GET", url) as response:
+                response.raise_for_status()
+                return await response.read()
+
+        return await self.retry_policy.run(fetch, url, self.logger)
+
+    async def prepare_album(self, album_data):
+        """
+        下載專輯封面並取得歌曲清單，拆分為歌曲層級的任務。
+        :param album_data: API 回傳的專輯資料。
+        :return: (專輯完成的 future, 歌曲任務列表)，future 在最後一首歌完成時
+                 解析為 True/False。
+        """
         try:
-            self.log_queue = album_data["log_queue"]
-            self.logger = get_mp_child_logger(self.log_queue, name=__name__)
             album_name = self.make_valid(album_data["name"])
             album_cid = album_data["cid"]
-            album_url = (
-                f"https://monster-siren.hypergryph.com/api/album/{album_cid}/detail"
-            )
+            album_url = f"{self.api_base}/album/{album_cid}/detail"
 
             album_directory = self.directory / album_name
             album_directory.mkdir(parents=True, exist_ok=True)
-            session = requests.Session()
 
             self.logger.info(f"開始下載專輯: {album_name}")
 
-            self.download_cover(session, album_directory, album_data["coverUrl"])
+            cover = await self.download_cover(album_directory, album_data["coverUrl"])
 
             # 取得專輯內歌曲清單
-            songs_data = session.get(
-                album_url, headers={"Accept": "application/json"}
-            ).json()["data"]["songs"]
+            songs_data = (await self.fetch_json(album_url))["data"]["songs"]
+            album_job = AlbumJob(album_data, album_directory, len(songs_data), cover)
+            if not songs_data:
+                self.finish_album(album_job)
+
+            song_jobs = []
             for song_track_number, song_data in enumerate(songs_data):
-                if self.stop_event.is_set():
-                    self.logger.warning(f"檢測到停止指令，停止下載專輯: {album_name}")
-                    return False
                 song_data["tracknumber"] = song_track_number + 1
-                self.download_song(session, album_directory, song_data, album_data)
-
-            # 更新 completed_albums.json
-            with self.mutex:
-                try:
-                    with open(
-                        self.directory / "completed_albums.json", "r", encoding="utf8"
-                    ) as f:
-                        completed_albums = json.load(f)
-                except:
-                    completed_albums = []
-
-                completed_albums.append(album_data["name"])
-                with open(
-                    self.directory / "completed_albums.json", "w+", encoding="utf8"
-                ) as f:
-                    json.dump(completed_albums, f)
-
-            self.logger.info(f"專輯 {album_data['name']} 下載完成。")
-            return True
+                song_job = SongJob(album_job, song_data)
+                song_job.progress_key = self._progress_key(
+                    album_directory, self.make_valid(song_data["name"])
+                )
+                self.progress.add(song_job.progress_key, song_data["name"])
+                if not self._reuse_existing(song_job):
+                    song_jobs.append(song_job)
+            if len(song_jobs) < len(songs_data):
+                self.logger.info(
+                    f"專輯 {album_name} 已有 {len(songs_data) - len(song_jobs)} 首歌曲，"
+                    f"需處理 {len(song_jobs)} 首"
+                )
+            return album_job.done, song_jobs
 
         except InterruptedError:
             self.logger.warning(f"檢測到停止指令，停止下載專輯: {album_data['name']}")
-            return False
+            return self._resolved(False), []
 
         except Exception as e:
             self.logger.exception(f"專輯 {album_data['name']} 下載失敗: {e}")
+            return self._resolved(False), []
+
+    def _reuse_existing(self, song_job):
+        """
+        依啟動時的目錄掃描結果處理已存在的歌曲。
+        :return: True 表示歌曲已完成，不需進入管線。
+        """
+        if self.library_index is None:
             return False
+        album_directory = song_job.album_job.album_directory
+        song_data = song_job.song_data
+        song_name = self.make_valid(song_data["name"])
+        action, path = self.library_index.plan_song(
+            album_directory, song_name, song_data["cid"], song_data["tracknumber"]
+        )
+        if action == LibraryIndex.SKIP:
+            song_job.song_name = song_name
+            song_job.file_path = path
+            self.song_done(song_job, True)
+            return True
+        if action == LibraryIndex.RELOCATE:
+            # 專輯或歌名改變：搬到目前的名稱，之後沿用該文件並重寫標籤
+            target = album_directory / f"{song_name}{path.suffix}"
+            if path != target:
+                os.replace(path, target)
+                self.logger.info(f"搬移既有歌曲: {path} -> {target}")
+            song_job.duplicate = self.state_store.get_song(song_data["cid"]) or {}
+            song_job.duplicate["path"] = str(target.relative_to(self.directory))
+        return False
+
+    def pipeline_stages(self):
+        """
+        歌曲處理管線：查詢下載網址、網路下載、CPU 轉檔、寫入元數據四個階段
+        各自有並行上限，讓網路與 CPU 可以同時保持忙碌。下載網址預先查好放進
+        下載階段的佇列，傳輸不必等待 API 往返。
+        :return: [(階段名稱, 協程函式, 並行數)]，交給 TaskManager 執行。
+        """
+        return [
+            (
+                "resolve",
+                self._stage("resolve", self.resolve_song),
+                self.metadata_workers,
+            ),
+            (
+                "fetch",
+                self._stage("fetch", self.fetch_song),
+                self.client.max_concurrency,
+            ),
+            (
+                "transcode",
+                self._stage("transcode", self.transcode_song),
+                self.max_workers,
+            ),
+            ("tag", self._stage("tag", self.tag_song, last=True), self.tag_workers),
+        ]
+
+    def _stage(self, name, function, last=False):
+        async def run(song_job):
+            song_name = song_job.song_data["name"]
+            try:
+                if self.stop_event.is_set():
+                    raise InterruptedError(f"下載被中斷: {song_name}")
+                self.progress.stage(song_job.progress_key, name)
+                await function(song_job)
+            except InterruptedError:
+                song_job.album_job.interrupted = True
+                self.song_done(song_job, False)
+                return None
+            except Exception as e:
+                self.logger.exception(f"處理歌曲失敗 ({name}): {song_name} - {e}")
+                self.song_done(song_job, False)
+                return None
+            if last:
+                self.song_done(song_job, True)
+                return None
+            if name == "fetch":
+                self._record_song(
+                    song_job,
+                    StateStore.DOWNLOADED,
+                    size=song_job.downloaded.size,
+                    checksum=song_job.downloaded.checksum,
+                    source_url=song_job.source_url,
+                    etag=song_job.downloaded.etag,
+                )
+            return song_job
+
+        return run
+
+    def song_done(self, song_job, success):
+        album_job = song_job.album_job
+        self.progress.finish(song_job.progress_key, success)
+        self.metrics.inc(
+            "songs_total",
+            result=(
+                "completed"
+                if success
+                else "interrupted" if album_job.interrupted else "failed"
+            ),
+        )
+        if success:
+            self._record_song(
+                song_job,
+                StateStore.COMPLETED,
+                path=song_job.file_path,
+                file_size=song_job.file_path.stat().st_size,
+            )
+        else:
+            album_job.failed = True
+            if not album_job.interrupted:
+                self._record_song(song_job, StateStore.FAILED)
+        album_job.remaining -= 1
+        if album_job.remaining == 0:
+            self.finish_album(album_job)
+
+    def finish_album(self, album_job):
+        album_data = album_job.album_data
+        if album_job.interrupted:
+            self.logger.warning(f"檢測到停止指令，停止下載專輯: {album_data['name']}")
+            album_job.done.set_result(False)
+            return
+        if album_job.failed:
+            self.logger.error(f"專輯 {album_data['name']} 下載失敗: 部分歌曲未完成")
+            self._record_album(album_data, StateStore.FAILED)
+            album_job.done.set_result(False)
+            return
+
+        try:
+            self.state_store.mark_album(
+                album_data["cid"], album_data["name"], StateStore.COMPLETED
+            )
+        except Exception as e:
+            self.logger.exception(f"專輯 {album_data['name']} 下載失敗: {e}")
+            album_job.done.set_result(False)
+            return
 
-    def download_cover(self, session, album_directory, cover_url):
+        self.logger.info(f"專輯 {album_data['name']} 下載完成。")
+        album_job.done.set_result(True)
+
+    def _record_album(self, album_data, status):
         try:
-            cover_path = album_directory / "cover.jpg"
-            with open(cover_path, "wb") as f:
-                f.write(session.get(cover_url).content)
+            self.state_store.mark_album(album_data["cid"], album_data["name"], status)
+        except Exception as e:
+            self.logger.exception(f"記錄專輯狀態失敗: {album_data['name']} - {e}")
 
-            with Image.open(cover_path) as img:
-                img.save(album_directory / "cover.png")
-            os.remove(cover_path)
+    def _record_song(self, song_job, status, path=None, **kwargs):
+        try:
+            self.state_store.mark_song(
+                song_job.song_data["cid"],
+                song_job.album_job.album_data["cid"],
+                song_job.song_data["name"],
+                status,
+                path=path.relative_to(self.directory) if path else None,
+                **kwargs,
+            )
+        except Exception as e:
+            self.logger.exception(
+                f"記錄歌曲狀態失敗: {song_job.song_data['name']} - {e}"
+            )
+
+    @staticmethod
+    def _resolved(result):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(result)
+        return future
+
+    async def download_cover(self, album_directory, cover_url):
+        """
+        下載並處理專輯封面一次，存檔後回傳供每首歌嵌入的 CoverArt。
+        """
+        try:
+            with self.metrics.track("cover"):
+                raw = await self.fetch_bytes(cover_url)
+                cover, embedded = await asyncio.to_thread(
+                    CoverArt.from_bytes, raw, self.cover_format, self.cover_max_size
+                )
+                with open(album_directory / f"cover{cover.extension}", "wb") as f:
+                    f.write(cover.data)
 
             self.logger.info(f"專輯封面下載完成: {cover_url}")
+            return embedded
         except Exception as e:
             self.logger.exception(f"下載專輯封面失敗: {cover_url} - {e}")
             raise
 
-    def download_song(self, session, album_directory, song_data, album_data):
+    async def resolve_song(self, song_job):
+        song_cid = song_job.song_data["cid"]
+        song_url = f"{self.api_base}/song/{song_cid}"
+        song_detail = (await self.fetch_json(song_url))["data"]
+        song_job.source_url = song_detail["sourceUrl"]
+        song_job.lyric_url = song_detail["lyricUrl"]
+
+    async def fetch_song(self, song_job):
+        album_directory = song_job.album_job.album_directory
+        song_name = self.make_valid(song_job.song_data["name"])
+        song_lyricUrl = song_job.lyric_url
+        song_job.song_name = song_name
+
+        # 歌詞與音訊同時下載，之後直接在記憶體中交給寫入標籤的階段
+        lyrics_task = (
+            asyncio.ensure_future(self.fetch_bytes(song_lyricUrl))
+            if song_lyricUrl
+            else None
+        )
         try:
-            song_cid = song_data["cid"]
-            song_name = self.make_valid(song_data["name"])
-            song_url = (
-                f"https://monster-siren.hypergryph.com/api/song/{song_cid}"
-            )
-            song_detail = session.get(
-                song_url, headers={"Accept": "application/json"}
-            ).json()["data"]
-            song_sourceUrl = song_detail["sourceUrl"]
-            song_lyricUrl = song_detail["lyricUrl"]
+            await self._fetch_audio(song_job, album_directory, song_name)
+        except BaseException:
+            if lyrics_task is not None:
+                lyrics_task.cancel()
+                await asyncio.gather(lyrics_task, return_exceptions=True)
+            raise
+
+        if lyrics_task is not None:
+            try:
+                lyrics = await lyrics_task
+            except Exception as e:
+                # 歌詞不影響歌曲本身，下載失敗時只略過歌詞
+                self.logger.warning(f"歌詞下載失敗，略過歌詞: {song_name} - {e}")
+                return
+            song_job.lyrics = lyrics.decode("utf-8-sig", errors="replace")
+            if self.lyrics_sidecar:
+                with open(album_directory / f"{song_name}.lrc", "wb") as f:
+                    f.write(lyrics)
+            self.logger.info(f"歌詞下載完成: {song_name} - {song_lyricUrl}")
 
+    async def _fetch_audio(self, song_job, album_directory, song_name):
+        song_sourceUrl = song_job.source_url
+        # 其他專輯已下載過相同來源時直接沿用，不再下載與轉檔
+        if song_job.duplicate is None:
+            song_job.duplicate = await self._find_duplicate(song_sourceUrl)
+        if song_job.duplicate:
+            duplicate = song_job.duplicate
+            song_job.downloaded = DownloadedFile(
+                None,
+                None,
+                duplicate.get("bytes"),
+                duplicate.get("checksum"),
+                etag=duplicate.get("etag"),
+            )
+            self.logger.info(
+                f"已有相同歌曲，略過下載: {song_name} - {duplicate['path']}"
+            )
+        else:
             # Download song
-            song_file = self.download_file(
-                session, album_directory, song_name, song_sourceUrl
+            song_job.downloaded = await self.download_file(
+                album_directory,
+                song_name,
+                song_sourceUrl,
+                tag_reserve=MetadataManager.reserved_space(song_job.album_job.cover),
             )
             self.logger.info(f"歌曲下載完成: {song_name} - {song_sourceUrl}")
+            # 網址不同但內容相同時，仍可省下轉檔與磁碟空間
+            song_job.duplicate = self._existing_song(
+                self.state_store.find_completed_song(
+                    checksum=song_job.downloaded.checksum
+                )
+            )
 
-            # Download lyric
-            if song_lyricUrl:
-                lyric_path = album_directory / f"{song_name}.lrc"
-                with open(lyric_path, "wb") as f:
-                    f.write(session.get(song_lyricUrl).content)
-                self.logger.info(f"歌詞下載完成: {song_name} - {song_lyricUrl}")
+    async def _find_duplicate(self, source_url):
+        duplicate = self._existing_song(
+            self.state_store.find_completed_song(source_url=source_url)
+        )
+        if duplicate is None or not duplicate["etag"]:
+            return None
 
-            MetadataManager.fill_metadata(
+        # 以 HEAD 確認遠端內容沒有變更
+        async def head():
+            async with self.client.request(
+                "HEAD", source_url, allow_redirects=True
+            ) as response:
+                response.raise_for_status()
+                return response.headers.get("etag")
+
+        import aiohttp
+
+        try:
+            etag = await self.retry_policy.run(head, source_url, self.logger)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # 比對重複只是最佳化：無法確認時照常下載，不讓歌曲失敗
+            self.logger.warning(
+                f"無法確認遠端文件是否變更，重新下載: {source_url} - {e}"
+            )
+            return None
+        return duplicate if etag == duplicate["etag"] else None
+
+    def _existing_song(self, row):
+        if row is None or not (self.directory / row["path"]).is_file():
+            return None
+        return row
+
+    async def transcode_song(self, song_job):
+        if song_job.duplicate:
+            song_job.file_path = await asyncio.to_thread(
+                self._reuse_duplicate, song_job
+            )
+            return
+        song_job.file_path = await self._finish_file(
+            song_job.downloaded,
+            MetadataManager.reserved_space(song_job.album_job.cover),
+        )
+
+    def _reuse_duplicate(self, song_job):
+        source_path = self.directory / song_job.duplicate["path"]
+        final_path = song_job.album_job.album_directory / (
+            f"{song_job.song_name}{source_path.suffix}"
+        )
+        if source_path != final_path:
+            clone_file(source_path, final_path)
+            self.logger.info(f"沿用相同歌曲: {source_path} -> {final_path}")
+        # 下載後才比對到相同內容時，捨棄暫存檔
+        file_path = song_job.downloaded.path
+        if file_path:
+            file_path.unlink(missing_ok=True)
+            file_path.with_name(f"{file_path.name}.json").unlink(missing_ok=True)
+        return final_path
+
+    async def tag_song(self, song_job):
+        album_data = song_job.album_job.album_data
+        song_data = song_job.song_data
+        song_file = song_job.file_path
+        # mutagen 為同步 I/O，交給執行緒處理
+        with self.metrics.track("tag"):
+            await asyncio.to_thread(
+                MetadataManager.fill_metadata,
                 file_path=song_file,
                 file_type=song_file.suffix,
                 metadata={
                     "album": self.make_valid(album_data["name"]),
-                    "title": song_name,
+                    "title": song_job.song_name,
                     "artist": song_data["artistes"],
                     "albumartist": album_data["artistes"],
                     "tracknumber": song_data["tracknumber"],
                 },
                 log_queue=self.log_queue,
-                cover_path=album_directory / "cover.png",
-                lyrics_path=lyric_path if song_lyricUrl else None,
+                cover=song_job.album_job.cover,
+                lyrics=song_job.lyrics,
             )
+
+    async def download_file(self, directory, filename, url, tag_reserve=0):
+        """
+        下載文件到 <filename>.tmp，支援續傳、分段下載與串流轉檔。
+        暫時性錯誤會重試，並從暫存檔的進度續傳。
+        :param tag_reserve: MP3 在檔頭預留給標籤的 bytes 數。
+        :return: DownloadedFile
+        """
+        try:
+            with self.metrics.track("download"):
+                downloaded = await self.retry_policy.run(
+                    lambda: self._download_file(directory, filename, url, tag_reserve),
+                    filename,
+                    self.logger,
+                )
+            self.metrics.inc("downloaded_bytes_total", downloaded.size or 0)
+            return downloaded
         except InterruptedError:
+            self.logger.warning(f"檢測到停止指令，停止下載文件: {filename}")
             raise
         except Exception as e:
-            self.logger.exception(f"下載歌曲失敗: {song_data['name']} - {e}")
+            self.logger.exception(f"下載文件失敗: {url} - {e}")
             raise
 
-    def download_file(self, session, directory, filename, url):
+    async def _download_file(self, directory, filename, url, tag_reserve):
+        bar = None
         try:
             file_path = directory / f"{filename}.tmp"
-            response = session.get(url, stream=True)
-            total_size = int(response.headers.get("content-length", 0))
-
-            # 檢查是否有標準輸出，如果沒有則不使用 tqdm
-            use_tqdm = sys.stdout is not None and sys.stdout.isatty()
-
-            with open(file_path, "wb") as f:
-                bar = (
-                    tqdm(
-                        desc=filename,
-                        total=total_size,
-                        unit="iB",
-                        unit_scale=True,
-                        unit_divisor=1024,
+            meta_path = directory / f"{filename}.tmp.json"
+
+            # 若有上次中斷留下的 .tmp，嘗試以 Range 續傳
+            partial = self._read_partial_meta(file_path, meta_path, url)
+            if partial and partial.get("segments"):
+                return await self._download_segmented_or_restart(
+                    directory, filename, url, tag_reserve, partial
+                )
+
+            base = partial.get("base", 0) if partial else 0
+            offset = file_path.stat().st_size - base if partial else 0
+            headers = {}
+            if partial and offset:
+                if partial["content_length"] and offset >= partial["content_length"]:
+                    # 上次已下載完成，只差後續處理
+                    self.logger.info(f"已有完整暫存檔，略過下載: {filename}")
+                    return await self._downloaded(
+                        file_path,
+                        partial["content_type"],
+                        base=base,
+                        etag=partial["etag"],
                     )
-                    if use_tqdm
-                    else None
+                headers["Range"] = f"bytes={offset}-"
+                validator = partial["etag"] or partial["last_modified"]
+                if validator:
+                    headers["If-Range"] = validator
+
+            async with contextlib.AsyncExitStack() as request:
+                response = await request.enter_async_context(
+                    self.client.request("GET", url, headers=headers)
                 )
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "")
+                etag = response.headers.get("etag")
 
-                for data in response.iter_content(chunk_size=1024):
-                    if self.stop_event.is_set():
-                        if bar:
-                            bar.close()
-                        raise InterruptedError(f"下載被中斷: {filename}")
-                    size = f.write(data)
+                if headers and self._is_valid_resume(response, offset, partial):
+                    mode = "ab"
+                    self.logger.info(f"續傳文件: {filename}，已下載 {offset} bytes")
+                elif response.status == 206:
+                    # 回應的是舊檔案的片段，需不帶 Range 重新請求
+                    mode = None
+                else:
+                    # 伺服器不支援 Range 或遠端檔案已變更，從頭下載
+                    if headers:
+                        self.logger.warning(f"遠端文件已變更，重新下載: {filename}")
+                    offset = 0
+                    if self.stream_transcode and content_type != "audio/mpeg":
+                        # 串流轉檔的輸出無法續傳，不保留續傳資訊
+                        mode = "stream"
+                        meta_path.unlink(missing_ok=True)
+                    else:
+                        mode = "wb"
+                        partial = self._partial_meta(url, response.headers)
+                        # MP3 在檔頭留空，轉檔階段會變成 ID3 標籤的 padding
+                        base = tag_reserve if content_type == "audio/mpeg" else 0
+                        partial["base"] = base
+                        segments = self._plan_segments(response.headers)
+                        if segments:
+                            partial["segments"] = segments
+                            with open(file_path, "wb") as f:
+                                f.truncate(base + partial["content_length"])
+                            self._write_partial_meta(meta_path, partial)
+                            # 回應交給第一段，寫完即釋放並行額度，
+                            # 不必等其他段完成
+                            first = (request.pop_all(), response)
+                            return await self._download_segmented_or_restart(
+                                directory, filename, url, tag_reserve, partial, first
+                            )
+                        self._write_partial_meta(meta_path, partial)
+
+                if mode:
+                    total_size = offset + int(response.headers.get("content-length", 0))
+                    bar = self._progress_bar(
+                        self._progress_key(directory, filename),
+                        filename,
+                        total_size,
+                        offset,
+                    )
+                    # 從頭下載時順便計算來源內容的 sha256，續傳則事後補算
+                    digest = hashlib.sha256() if offset == 0 else None
+                    if mode == "stream":
+                        size = await self._stream_to_flac(
+                            response, file_path, filename, bar, digest, tag_reserve
+                        )
+                        content_type = "audio/flac"
+                    else:
+                        with open(file_path, mode) as f:
+                            if mode == "wb":
+                                self._preallocate(f, meta_path, partial, base)
+                            try:
+                                await self._write_response(
+                                    response, f, filename, bar, digest=digest
+                                )
+                            finally:
+                                if partial.get("preallocated"):
+                                    # 截掉未寫入的部分，讓檔案大小等於實際進度
+                                    f.truncate()
+                                    partial["preallocated"] = False
+                                    self._write_partial_meta(meta_path, partial)
+                        size = None
                     if bar:
-                        bar.update(size)
+                        bar.close()
 
-                if bar:
-                    bar.close()
+            if mode is None:
+                self.logger.warning(f"遠端文件已變更，重新下載: {filename}")
+                file_path.unlink(missing_ok=True)
+                meta_path.unlink(missing_ok=True)
+                return await self._download_file(directory, filename, url, tag_reserve)
 
-            return self._check_file_suffix(file_path, response)
+            return await self._downloaded(
+                file_path, content_type, digest, size, base, etag
+            )
 
-        except InterruptedError:
+        except BaseException:
             if bar:
                 bar.close()
-            self.logger.warning(f"檢測到停止指令，停止下載文件: {filename}")
             raise
 
-        except Exception as e:
+    def _plan_segments(self, headers):
+        """
+        依第一個 GET 回應的大小與 Range 支援決定是否拆段，不另外發送 HEAD；
+        第一段沿用該回應的內容，其餘各段再以 Range 請求。
+        :param headers: 不帶 Range 的 GET 回應標頭。
+        :return: 各段的 [起點, 終點(含), 已完成 bytes]，不拆段時為 None。
+        """
+        if self.segments < 2 or headers.get("accept-ranges") != "bytes":
+            return None
+        size = int(headers.get("content-length", 0))
+        count = min(self.segments, size // self.min_segment_size)
+        if count < 2:
+            return None
+        step = -(-size // count)
+        return [
+            [start, min(start + step, size) - 1, 0] for start in range(0, size, step)
+        ]
+
+    async def _download_segmented_or_restart(
+        self, directory, filename, url, tag_reserve, partial, first=None
+    ):
+        file_path = directory / f"{filename}.tmp"
+        meta_path = directory / f"{filename}.tmp.json"
+        try:
+            return await self._download_segmented(
+                file_path, meta_path, filename, url, partial, first
+            )
+        except RemoteFileChangedError:
+            self.logger.warning(f"遠端文件已變更，重新下載: {filename}")
+            file_path.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+            return await self._download_file(directory, filename, url, tag_reserve)
+
+    async def _download_segmented(
+        self, file_path, meta_path, filename, url, partial, first=None
+    ):
+        """
+        :param first: (請求的 AsyncExitStack, 尚未讀取的 GET 回應)，用於下載第一段，
+                      寫完即關閉；續傳時為 None，各段都以 Range 請求。
+        """
+        segments = partial["segments"]
+        total_size = partial["content_length"]
+        base = partial.get("base", 0)
+        if file_path.stat().st_size != base + total_size:
+            raise RemoteFileChangedError(f"暫存檔大小不符: {filename}")
+
+        done = sum(segment[2] for segment in segments)
+        bar = self._progress_bar(
+            self._progress_key(file_path.parent, filename), filename, total_size, done
+        )
+        self.logger.info(f"分段下載文件: {filename}，共 {len(segments)} 段")
+
+        tasks = [
+            asyncio.create_task(
+                self._write_first_segment(first, file_path, filename, partial, bar)
+                if first is not None and index == 0
+                else self._download_segment(
+                    url, file_path, filename, partial, segment, bar
+                )
+            )
+            for index, segment in enumerate(segments)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            if first is not None:
+                # 第一段的工作在開始前就被取消時，由這裡關閉回應
+                await first[0].aclose()
             if bar:
                 bar.close()
-            self.logger.exception(f"下載文件失敗: {url} - {e}")
+            # 保存各段進度，下次可從中斷處續傳
+            self._write_partial_meta(meta_path, partial)
+
+        return await self._downloaded(
+            file_path, partial["content_type"], base=base, etag=partial["etag"]
+        )
+
+    async def _download_segment(self, url, file_path, filename, partial, segment, bar):
+        start, end, done = segment
+        if start + done > end:
+            return
+        headers = {"Range": f"bytes={start + done}-{end}"}
+        validator = partial["etag"] or partial["last_modified"]
+        if validator:
+            headers["If-Range"] = validator
+
+        async with self.client.request("GET", url, headers=headers) as response:
+            response.raise_for_status()
+            if not self._is_valid_resume(response, start + done, partial):
+                raise RemoteFileChangedError(f"遠端文件已變更: {filename}")
+            await self._write_segment(
+                response, file_path, filename, partial, segment, bar
+            )
+
+    async def _write_first_segment(self, first, file_path, filename, partial, bar):
+        request, response = first
+        async with request:
+            await self._write_segment(
+                response, file_path, filename, partial, partial["segments"][0], bar
+            )
+
+    async def _write_segment(
+        self, response, file_path, filename, partial, segment, bar
+    ):
+        start, end, done = segment
+        with open(file_path, "r+b") as f:
+            f.seek(partial.get("base", 0) + start + done)
+            # 完整文件的回應只讀到本段結尾
+            await self._write_response(
+                response, f, filename, bar, segment, limit=end - start - done + 1
+            )
+
+    async def _downloaded(
+        self, file_path, content_type, digest=None, size=None, base=0, etag=None
+    ):
+        if digest is None:
+            checksum = await asyncio.to_thread(self._file_digest, file_path, base)
+        else:
+            checksum = digest.hexdigest()
+        if size is None:
+            size = file_path.stat().st_size - base
+        return DownloadedFile(file_path, content_type, size, checksum, base, etag)
+
+    @staticmethod
+    def _file_digest(file_path, base=0):
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            f.seek(base)
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _preallocate(self, f, meta_path, partial, base):
+        # 依 Content-Length 預先配置空間；寫入期間標記 preallocated，
+        # 若行程意外結束，下次會從頭下載而不是誤判為已完成
+        length = partial["content_length"]
+        if length:
+            partial["preallocated"] = True
+            self._write_partial_meta(meta_path, partial)
+            f.truncate(base + length)
+        f.seek(base)
+
+    async def _write_response(
+        self, response, f, filename, bar, segment=None, digest=None, limit=None
+    ):
+        """
+        把回應內容寫入已開啟的文件。資料先累積在可重複使用的緩衝區，
+        滿了才寫入；進度更新與停止檢查依時間節流。
+        :param limit: 最多寫入的 bytes 數，達到後不再讀取其餘內容。
+        :return: 寫入的 bytes 數。
+        """
+        buffer = bytearray(self.WRITE_BUFFER_SIZE)
+        view = memoryview(buffer)
+        filled = 0
+        written = 0
+        reported = 0
+        next_check = time.monotonic() + self.PROGRESS_INTERVAL
+        stall = [next_check - self.PROGRESS_INTERVAL, 0]
+        reached = False
+        url = response.url
+
+        def commit(data):
+            nonlocal written
+            f.write(data)
+            written += len(data)
+            if segment:
+                segment[2] += len(data)
+
+        try:
+            async for data in response.content.iter_any():
+                size = len(data)
+                if limit is not None and written + filled + size >= limit:
+                    data = data[: limit - written - filled]
+                    size = len(data)
+                    limit = None
+                    reached = True
+                await self.client.account(size, url)
+                if digest:
+                    digest.update(data)
+                if filled + size > len(buffer):
+                    commit(view[:filled])
+                    filled = 0
+                if size >= len(buffer):
+                    commit(data)
+                else:
+                    view[filled : filled + size] = data
+                    filled += size
+                if reached:
+                    break
+
+                now = time.monotonic()
+                if now >= next_check:
+                    next_check = now + self.PROGRESS_INTERVAL
+                    if self.stop_event.is_set():
+                        raise InterruptedError(f"下載被中斷: {filename}")
+                    self._check_stall(stall, now, written + filled, filename)
+                    if bar:
+                        bar.update(written + filled - reported)
+                        reported = written + filled
+        finally:
+            # 已收到的資料都是有效的，中斷時也寫入以利續傳
+            if filled:
+                commit(view[:filled])
+            if bar:
+                bar.update(written - reported)
+        return written
+
+    def _check_stall(self, stall, now, received, filename):
+        # stall: [觀察起點時間, 起點時已收到的 bytes]。完全沒有資料時由
+        # sock_read 逾時處理，這裡處理有資料但速度過慢的連線
+        since, since_received = stall
+        if now - since < self.stall_timeout:
+            return
+        speed = (received - since_received) / (now - since)
+        if speed < self.STALL_MIN_SPEED:
+            raise StalledTransferError(
+                f"傳輸過慢 ({speed:.0f} B/s)，中斷連線: {filename}"
+            )
+        stall[:] = [now, received]
+
+    @staticmethod
+    def _progress_key(directory, filename):
+        return str(directory / filename)
+
+    def _progress_bar(self, key, filename, total_size, initial=0):
+        # 進度一律回報給 ProgressTracker；有標準輸出時另外顯示 tqdm 進度條
+        bar = None
+        if sys.stdout is not None and sys.stdout.isatty():
+            from tqdm import tqdm
+
+            bar = tqdm(
+                desc=filename,
+                total=total_size,
+                initial=initial,
+                unit="iB",
+                unit_scale=True,
+                unit_divisor=1024,
+                leave=False,
+            )
+        return self.progress.file(key, total_size, initial, bar)
+
+    async def _stream_to_flac(
+        self, response, file_path, filename, bar, digest, tag_reserve
+    ):
+        # 邊下載邊把 wav 資料送進 ffmpeg，直接輸出 flac，wav 不落地也不整首載入記憶體
+        reserve_args = []
+        ffmeta_path = file_path.with_name(f"{file_path.name}.ffmeta")
+        if tag_reserve:
+            MetadataManager.write_reserve_ffmetadata(ffmeta_path, tag_reserve)
+            reserve_args = ["-f", "ffmetadata", "-i", str(ffmeta_path)]
+            reserve_args += ["-map_metadata", "1"]
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "wav",
+            "-i",
+            "pipe:0",
+            *reserve_args,
+            "-f",
+            "flac",
+            str(file_path),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        size = 0
+        reported = 0
+        next_check = time.monotonic() + self.PROGRESS_INTERVAL
+        stall = [next_check - self.PROGRESS_INTERVAL, 0]
+        try:
+            async for data in response.content.iter_any():
+                await self.client.account(len(data), response.url)
+                process.stdin.write(data)
+                await process.stdin.drain()
+                digest.update(data)
+                size += len(data)
+
+                now = time.monotonic()
+                if now >= next_check:
+                    next_check = now + self.PROGRESS_INTERVAL
+                    if self.stop_event.is_set():
+                        raise InterruptedError(f"下載被中斷: {filename}")
+                    self._check_stall(stall, now, size, filename)
+                    if bar:
+                        bar.update(size - reported)
+                        reported = size
+            if bar:
+                bar.update(size - reported)
+            process.stdin.close()
+            await process.stdin.wait_closed()
+            stderr = await process.stderr.read()
+            if await process.wait() != 0:
+                raise RuntimeError(
+                    f"ffmpeg 轉檔失敗: {stderr.decode(errors='replace').strip()}"
+                )
+            return size
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            file_path.unlink(missing_ok=True)
             raise
+        finally:
+            ffmeta_path.unlink(missing_ok=True)
+
+    async def _finish_file(self, downloaded, tag_reserve=0):
+        # 轉檔完成後才刪除續傳資訊，轉檔前中斷仍可沿用完整的暫存檔
+        file_path = downloaded.path
+        # 轉檔在行程池中執行，計時在主行程等待結果處進行
+        with self.metrics.track("transcode"):
+            final_path = await self._check_file_suffix(downloaded, tag_reserve)
+        file_path.with_name(f"{file_path.name}.json").unlink(missing_ok=True)
+        return final_path
+
+    def _read_partial_meta(self, file_path, meta_path, url):
+        # 讀取暫存檔的驗證資訊，若不存在或不屬於同一個 URL 則視為無效
+        if not file_path.exists() or not meta_path.exists():
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf8") as f:
+                partial = json.load(f)
+        except Exception:
+            return None
+        if partial.get("url") != url or partial.get("preallocated"):
+            return None
+        return partial
+
+    def _partial_meta(self, url, headers):
+        return {
+            "url": url,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "content_length": int(headers.get("content-length", 0)),
+            "content_type": headers.get("content-type", ""),
+        }
 
-    def _check_file_suffix(self, file_path, response):
+    def _write_partial_meta(self, meta_path, partial):
+        with open(meta_path, "w", encoding="utf8") as f:
+            json.dump(partial, f)
+
+    def _is_valid_resume(self, response, offset, partial):
+        # 只有 206 且 Content-Range 起點與總長度都吻合時才接續寫入
+        if response.status != 206:
+            return False
+        etag = response.headers.get("etag")
+        if etag and partial["etag"] and etag != partial["etag"]:
+            return False
+        content_range = response.headers.get("content-range", "")
+        try:
+            unit, _, rest = content_range.partition(" ")
+            byte_range, _, total = rest.partition("/")
+            start = int(byte_range.split("-")[0])
+        except ValueError:
+            return False
+        if unit != "bytes" or start != offset:
+            return False
+        if partial["content_length"] and total != str(partial["content_length"]):
+            return False
+        return True
+
+    async def _check_file_suffix(self, downloaded, tag_reserve=0):
+        file_path = downloaded.path
+        content_type = downloaded.content_type
         final_path = file_path
-        content_type = response.headers.get("content-type", "")
         if content_type == "audio/mpeg":
             final_path = file_path.with_suffix(".mp3")
+            # 把下載時預留的檔頭空間轉為 ID3 padding
+            await asyncio.to_thread(
+                MetadataManager.reserve_id3_space, file_path, downloaded.base
+            )
+            file_path.rename(final_path)
+        elif content_type == "audio/flac":
+            # 已在下載時串流轉檔完成
+            final_path = file_path.with_suffix(".flac")
             file_path.rename(final_path)
         else:
             # 其餘是 wav 文件，需轉換為 flac
             try:
                 final_path = file_path.with_suffix(".flac")
-                wav_file = AudioSegment.from_wav(str(file_path))
-                wav_file.export(str(final_path), format="flac")
-                os.remove(file_path)
+                loop = asyncio.get_running_loop()
+                # 被取消時保留在 transcoding 中，結束轉檔行程後再清理輸出
+                self.transcoding.add(final_path)
+                await loop.run_in_executor(
+                    self.executor,
+                    convert_wav_to_flac,
+                    file_path,
+                    final_path,
+                    tag_reserve,
+                )
+                self.transcoding.discard(final_path)
             except Exception as e:
+                self.transcoding.discard(final_path)
                 self.logger.exception(f"轉換 wav 文件失敗: {file_path} - {e}")
                 raise
         return final_path
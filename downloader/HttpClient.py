@@ -0,0 +1,154 @@
+import time
+import asyncio
+import contextlib
+from urllib.parse import urlsplit
+from .ConcurrencyController import ConcurrencyController
+from .BandwidthLimiter import BandwidthLimiter
+from .Metrics import Metrics
+
+
+class HttpClient:
+    """
+    整個下載流程共用的 HTTP 客戶端。所有專輯與階段共用同一個連線池，
+    keep-alive 的連線與 DNS 查詢結果可跨專輯沿用，不必每張專輯重新交握。
+    非同步請求經過每個主機各自的 ConcurrencyController 與選填的 BandwidthLimiter：
+    API 的節流不會降低 CDN 的並行數，API 請求也不必排在大文件的傳輸後面；
+    事件迴圈外的同步請求（如專輯列表）使用長期存在的 requests.Session。
+    aiohttp 與 requests 在第一次用到時才載入，沒有工作時不拖慢啟動。
+    """
+
+    # aiohttp 每次可交出的資料量
+    READ_BUFSIZE = 256 * 1024
+    # DNS 快取與閒置連線保留的秒數，涵蓋專輯之間的空檔
+    DNS_CACHE_TTL = 300
+    KEEPALIVE_TIMEOUT = 60
+
+    def __init__(
+        self,
+        max_concurrency=64,
+        min_concurrency=4,
+        bandwidth_limit=None,
+        connect_timeout=10,
+        read_timeout=30,
+        metrics=None,
+        log_queue=None,
+    ):
+        """
+        :param max_concurrency: 每個主機同時進行的 HTTP 傳輸上限，也是連線池大小。
+        :param min_concurrency: 每個主機同時進行的 HTTP 傳輸下限，實際數量在上下限之間
+                                依吞吐量、延遲與節流回應自動調整。
+        :param bandwidth_limit: 所有傳輸共用的頻寬上限（bytes/秒），None 表示不限制。
+        :param connect_timeout: 建立連線的逾時秒數。
+        :param read_timeout: 等待回應標頭或下一塊資料的逾時秒數。
+        :param metrics: 共用的 Metrics，None 時建立一個只供本客戶端使用的。
+        :param log_queue: 日誌佇列。
+        """
+        self.metrics = metrics or Metrics()
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.bandwidth_limit = bandwidth_limit
+        self.log_queue = log_queue
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._create_limiters()
+        self.session = None
+        self.sync_session = None
+
+    def _create_limiters(self):
+        # {主機: ConcurrencyController}，第一次請求該主機時建立
+        self.controllers = {}
+        self.bandwidth_limiter = (
+            BandwidthLimiter(self.bandwidth_limit) if self.bandwidth_limit else None
+        )
+
+    async def open(self):
+        # aiohttp 的 session 與 asyncio 的同步原語都綁定事件迴圈，每次執行下載時建立
+        import aiohttp
+
+        self._create_limiters()
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            limit_per_host=self.max_concurrency,
+            ttl_dns_cache=self.DNS_CACHE_TTL,
+            keepalive_timeout=self.KEEPALIVE_TIMEOUT,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            connect=self.connect_timeout,
+            sock_connect=self.connect_timeout,
+            sock_read=self.read_timeout,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector, read_bufsize=self.READ_BUFSIZE, timeout=timeout
+        )
+        return self
+
+    async def aclose(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    @contextlib.asynccontextmanager
+    async def request(self, method, url, **kwargs):
+        # 所有 HTTP 請求都經過並行控制，並回報狀態碼與首位元組延遲
+        import aiohttp
+
+        controller = self.controller(url)
+        async with controller:
+            started = time.monotonic()
+            try:
+                response = await self.session.request(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                controller.record_response(None, time.monotonic() - started)
+                self.metrics.inc("http_errors_total", error=type(e).__name__)
+                raise
+            controller.record_response(response.status, time.monotonic() - started)
+            self.metrics.inc(
+                "http_responses_total", method=method, status=response.status
+            )
+            async with response:
+                yield response
+
+    def controller(self, url):
+        """
+        :param url: 請求的網址。
+        :return: 該網址主機的 ConcurrencyController。
+        """
+        host = urlsplit(str(url)).netloc
+        controller = self.controllers.get(host)
+        if controller is None:
+            controller = self.controllers[host] = ConcurrencyController(
+                self.min_concurrency,
+                self.max_concurrency,
+                name=host,
+                log_queue=self.log_queue,
+            )
+        return controller
+
+    async def account(self, size, url):
+        """
+        回報已收到的 bytes 數；設有頻寬上限時會在額度不足時暫停。
+        :param url: 回應的網址，用於找到對應主機的並行控制。
+        """
+        self.controller(url).record_bytes(size)
+        self.metrics.inc("received_bytes_total", size)
+        if self.bandwidth_limiter:
+            await self.bandwidth_limiter.consume(size)
+
+    def get_sync(self, url, headers=None):
+        if self.sync_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self.sync_session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=self.max_concurrency)
+            self.sync_session.mount("http://", adapter)
+            self.sync_session.mount("https://", adapter)
+        return self.sync_session.get(
+            url, headers=headers, timeout=(self.connect_timeout, self.read_timeout)
+        )
+
+    def close(self):
+        if self.sync_session is not None:
+            self.sync_session.close()
+            self.sync_session = None
@@ -0,0 +1,194 @@
+from .my_logger import get_mp_child_logger
+from .StateStore import StateStore
+import os
+import time
+
+
+class LibraryIndex:
+    """
+    啟動時以 os.scandir 掃描下載目錄（根目錄/專輯/文件兩層），依 cid、文件名稱
+    與曲目編號比對目錄，逐首決定略過、續傳或重新下載。
+    記錄的路徑不存在時（專輯目錄在磁碟上被改名），依文件大小在其他目錄中尋找。
+    需要讀取標籤才能辨識的文件，結果依 (大小, mtime) 快取在 StateStore，
+    文件未變更時不再開啟。
+    """
+
+    SKIP = "skip"
+    RELOCATE = "relocate"
+    RESUME = "resume"
+    DOWNLOAD = "download"
+    # 試算模式使用：沿用其他專輯已下載的相同來源
+    REUSE = "reuse"
+
+    AUDIO_SUFFIXES = (".mp3", ".flac")
+
+    def __init__(self, directory, state_store, log_queue=None):
+        """
+        :param directory: 下載根目錄。
+        :param state_store: 記錄下載狀態與標籤快取的 StateStore。
+        :param log_queue: 日誌佇列。
+        """
+        self.directory = directory
+        self.state_store = state_store
+        self.logger = get_mp_child_logger(log_queue, name=__name__)
+        # {相對路徑: (大小, mtime_ns)}
+        self.files = {}
+        # {專輯目錄名稱: [文件名稱]}
+        self.albums = {}
+        self.tracks = {}
+        # 已由 StateStore 記錄為完成的 [(專輯 cid, 相對路徑, 文件大小)]
+        self.completed = []
+        self.completed_paths = set()
+        # {文件大小: [相對路徑]}，只包含音訊文件
+        self.sizes = {}
+        self._pending_tracks = []
+
+    def scan(self):
+        started = time.perf_counter()
+        files = {}
+        albums = {}
+        with os.scandir(self.directory) as root:
+            for album_entry in root:
+                if not album_entry.is_dir():
+                    continue
+                names = []
+                with os.scandir(album_entry.path) as entries:
+                    for entry in entries:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                        files[os.path.join(album_entry.name, entry.name)] = (
+                            stat.st_size,
+                            stat.st_mtime_ns,
+                        )
+                        names.append(entry.name)
+                albums[album_entry.name] = names
+        self.files = files
+        self.albums = albums
+        self.tracks = self.state_store.library_tracks()
+        self.completed = self.state_store.completed_song_files()
+        self.completed_paths = {path for _, path, _ in self.completed}
+        self.sizes = {}
+        for relative, (size, _) in files.items():
+            if relative.endswith(self.AUDIO_SUFFIXES):
+                self.sizes.setdefault(size, []).append(relative)
+        self.logger.info(
+            f"掃描下載目錄完成: {len(albums)} 個專輯目錄、{len(files)} 個文件，"
+            f"耗時 {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return self
+
+    def missing_albums(self):
+        """
+        :return: 標記為完成、但有歌曲文件已不存在或大小不符的專輯 cid。
+        """
+        missing = set()
+        for album_cid, path, file_size in self.completed:
+            if not self._matches(path, file_size):
+                missing.add(album_cid)
+        return missing
+
+    def plan_song(self, album_directory, song_name, song_cid, tracknumber):
+        """
+        決定單首歌曲的處理方式。
+        :param album_directory: 專輯目錄。
+        :param song_name: 已轉為合法文件名稱的歌名。
+        :param song_cid: 歌曲 cid。
+        :param tracknumber: 曲目編號（從 1 開始）。
+        :return: (處理方式, 既有文件的絕對路徑或 None)。
+        """
+        album_name = album_directory.name
+
+        # 1. 依 cid 找到先前完成的文件；專輯或歌名改變時需搬移並重寫標籤
+        row = self.state_store.get_song(song_cid)
+        if row and row["status"] == StateStore.COMPLETED and row["path"]:
+            relative = self._locate(row["path"], row["file_size"])
+            if relative is not None:
+                path = self.directory / relative
+                if path.parent == album_directory and path.stem == song_name:
+                    return self.SKIP, path
+                return self.RELOCATE, path
+
+        # 2. 依「專輯目錄/歌名」比對：沒有記錄的是舊版下載的文件，直接略過；
+        #    有記錄但未完成的是轉檔後、寫入標籤前被中斷的文件，沿用並重寫標籤
+        for suffix in self.AUDIO_SUFFIXES:
+            relative = os.path.join(album_name, f"{song_name}{suffix}")
+            if relative in self.files:
+                if row is None:
+                    return self.SKIP, self.directory / relative
+                return self.RELOCATE, self.directory / relative
+
+        # 3. 歌名改變的文件：依標籤中的曲目編號比對
+        path = self._find_track(album_name, tracknumber)
+        if path is not None:
+            return self.RELOCATE, path
+
+        if os.path.join(album_name, f"{song_name}.tmp") in self.files:
+            return self.RESUME, None
+        return self.DOWNLOAD, None
+
+    def _matches(self, path, file_size):
+        stat = self.files.get(path)
+        return stat is not None and (file_size is None or stat[0] == file_size)
+
+    def _locate(self, path, file_size):
+        """
+        :param path: StateStore 記錄的相對路徑。
+        :param file_size: 記錄的文件大小。
+        :return: 文件目前的相對路徑；記錄的路徑不存在時，改找大小相同、
+                 且未被其他已完成歌曲使用的文件（同名者優先），找不到時為 None。
+        """
+        if self._matches(path, file_size):
+            return path
+        if file_size is None:
+            return None
+        candidates = [
+            relative
+            for relative in self.sizes.get(file_size, ())
+            if relative not in self.completed_paths
+        ]
+        name = os.path.basename(path)
+        for relative in candidates:
+            if os.path.basename(relative) == name:
+                return relative
+        if len(candidates) == 1:
+            return candidates[0]
+        return None
+
+    def _find_track(self, album_name, tracknumber):
+        for name in self.albums.get(album_name, ()):
+            if not name.endswith(self.AUDIO_SUFFIXES):
+                continue
+            relative = os.path.join(album_name, name)
+            if relative in self.completed_paths:
+                # 已記錄的文件屬於特定歌曲，不參與曲目編號比對
+                continue
+            if self._tracknumber(relative) == tracknumber:
+                return self.directory / relative
+        return None
+
+    def _tracknumber(self, relative):
+        size, mtime_ns = self.files[relative]
+        cached = self.tracks.get(relative)
+        if cached and cached[0] == size and cached[1] == mtime_ns:
+            return cached[2]
+
+        tracknumber = None
+        try:
+            import mutagen
+
+            audio = mutagen.File(self.directory / relative, easy=True)
+            value = audio.get("tracknumber", [None])[0] if audio else None
+            if value:
+                tracknumber = int(str(value).split("/")[0])
+        except Exception as e:
+            self.logger.warning(f"無法讀取標籤: {relative} - {e}")
+        self.tracks[relative] = (size, mtime_ns, tracknumber)
+        self._pending_tracks.append((relative, size, mtime_ns, tracknumber))
+        return tracknumber
+
+    def save(self):
+        # 將新讀取的標籤結果寫入快取
+        if self._pending_tracks:
+            self.state_store.put_library_tracks(self._pending_tracks)
+            self._pending_tracks = []
@@ -1,40 +1,105 @@
 from .my_logger import get_mp_child_logger
-import pylrc
-from mutagen.easyid3 import EasyID3
-from mutagen.id3 import ID3, APIC, SYLT, Encoding
-from mutagen.flac import FLAC, Picture
-from PIL import Image
+import os
+import re
+import shutil
 
 
 class MetadataManager:
+    # 預留給文字標籤與歌詞的空間，封面大小另外計算
+    TAG_PADDING = 64 * 1024
+    # 轉檔時用來佔位的 Vorbis comment 名稱，寫入標籤時會移除
+    RESERVED_KEY = "reserved"
+    # LRC 的時間標記 [mm:ss.xx] 與整體偏移 [offset:+/-毫秒]
+    LRC_TIMESTAMP = re.compile(r"\[(\d+):(\d+(?:[.:]\d+)?)\]")
+    LRC_OFFSET = re.compile(r"\[offset:\s*([+-]?\d+)\]", re.IGNORECASE)
+
+    @staticmethod
+    def reserved_space(cover=None):
+        """
+        計算寫入標籤前應預留的空間。
+        :param cover: 要嵌入的 CoverArt（選填）。
+        :return: 預留的 bytes 數。
+        """
+        return MetadataManager.TAG_PADDING + (len(cover.data) if cover else 0)
+
+    @staticmethod
+    def reserve_id3_space(file_path, base):
+        """
+        下載 MP3 時在檔頭留下了 base bytes 的空洞。將原本的 ID3 標籤移到檔頭，
+        並把空洞變成該標籤的 padding，之後寫入標籤即可原地覆寫，不需搬移音訊資料。
+        :param file_path: 音樂文件路徑。
+        :param base: 檔頭預留的 bytes 數。
+        """
+        if base < 10:
+            return
+        with open(file_path, "r+b") as f:
+            if f.read(3) == b"ID3":
+                # 已處理過（例如轉檔後、改名前被中斷）
+                return
+            f.seek(base)
+            header = f.read(10)
+            if header[:3] != b"ID3":
+                # 沒有標籤：在空洞建立一個只有 padding 的 ID3v2.4 標籤
+                f.seek(0)
+                f.write(b"ID3\x04\x00\x00" + _syncsafe(base - 10))
+                return
+            if header[3] in (3, 4) and not header[5] & 0x10:
+                # 原標籤內容往前搬移，其後接上 padding（v2.4 footer 不允許 padding）
+                size = _syncsafe_decode(header[6:10])
+                body = f.read(size)
+                f.seek(0)
+                f.write(header[:6] + _syncsafe(size + base) + body)
+                f.write(b"\x00" * base)
+                return
+
+        # 無法原地調整的標籤格式，移除空洞
+        temp_path = f"{file_path}.part"
+        with open(file_path, "rb") as src, open(temp_path, "wb") as dst:
+            src.seek(base)
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(temp_path, file_path)
+
+    @staticmethod
+    def write_reserve_ffmetadata(path, size):
+        """
+        產生 ffmpeg 的 metadata 檔，以一個佔位的 comment 讓輸出的 flac 預留標籤空間。
+        :param path: 輸出的 metadata 檔路徑。
+        :param size: 預留的 bytes 數。
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f";FFMETADATA1\n{MetadataManager.RESERVED_KEY}={'0' * size}\n")
+
+    @staticmethod
+    def _keep_padding(info):
+        # 空間足夠時維持原有 padding，mutagen 就會原地寫入而不重寫整個文件
+        if info.padding >= 0:
+            return info.padding
+        return info.get_default_padding()
+
     @staticmethod
     def fill_metadata(
         file_path,
         file_type,
         metadata,
         log_queue,
-        cover_path=None,
-        lyrics_path=None,
+        cover=None,
+        lyrics=None,
     ):
         """
         填寫音樂文件的元數據。
         :param file_path: 音樂文件的完整路徑。
         :param file_type: 文件類型，支持 ".mp3" 和 ".flac"。
         :param metadata: 包含元數據的字典（如專輯、標題、歌手等）。
-        :param cover_path: 專輯封面圖片的路徑（選填）。
-        :param lyrics_path: 歌詞文件的路徑（選填）。
+        :param cover: 專輯封面的 CoverArt（選填）。
+        :param lyrics: LRC 格式的歌詞文字（選填）。
         """
         logger = get_mp_child_logger(log_queue=log_queue, name=__name__)
 
         try:
             if file_type == ".mp3":
-                MetadataManager._fill_mp3_metadata(
-                    file_path, metadata, cover_path, lyrics_path
-                )
+                MetadataManager._fill_mp3_metadata(file_path, metadata, cover, lyrics)
             elif file_type == ".flac":
-                MetadataManager._fill_flac_metadata(
-                    file_path, metadata, cover_path, lyrics_path
-                )
+                MetadataManager._fill_flac_metadata(file_path, metadata, cover, lyrics)
             else:
                 raise ValueError(f"不支持的文件類型: {file_type}")
 
@@ -44,77 +109,139 @@ class MetadataManager:
             raise
 
     @staticmethod
-    def _lyric_file_to_text(self, filename):
-        with open(filename, "r", encoding="utf-8") as lrc_file:
-            lrc_string = lrc_file.read()
-        subs = pylrc.parse(lrc_string)
-        ret = []
-        for sub in subs:
-            time_ms = int(sub.time * 1000)
-            text = sub.text
-            ret.append((text, time_ms))
-        return ret
+    def parse_lrc(lrc_text):
+        """
+        把 LRC 歌詞轉為 SYLT 使用的 [(歌詞, 毫秒)]，依時間排序。
+        一行可有多個時間標記；[ar:]、[ti:] 等其他標籤會被略過。
+        :param lrc_text: LRC 格式的歌詞文字。
+        """
+        entries = []
+        offset = 0
+        for line in lrc_text.splitlines():
+            line = line.strip()
+            times = []
+            position = 0
+            while True:
+                match = MetadataManager.LRC_TIMESTAMP.match(line, position)
+                if match is None:
+                    break
+                minutes, seconds = match.groups()
+                seconds = float(seconds.replace(":", "."))
+                times.append(int(minutes) * 60000 + round(seconds * 1000))
+                position = match.end()
+            if not times:
+                match = MetadataManager.LRC_OFFSET.match(line)
+                if match:
+                    offset = int(match.group(1))
+                continue
+            text = line[position:].strip()
+            entries.extend((text, time_ms) for time_ms in times)
+        # 正的 offset 表示歌詞要提早出現
+        entries = [(text, max(time_ms - offset, 0)) for text, time_ms in entries]
+        entries.sort(key=lambda entry: entry[1])
+        return entries
 
     @staticmethod
-    def _fill_mp3_metadata(file_path, metadata, cover_path, lyrics_path):
-        mp3_file = EasyID3(file_path)
-        mp3_file["album"] = metadata.get("album", "")
-        mp3_file["title"] = metadata.get("title", "")
-        mp3_file["artist"] = metadata.get("artist", "")
-        mp3_file["albumartist"] = metadata.get("albumartist", "")
-        mp3_file["tracknumber"] = str(metadata.get("tracknumber", 1))
-        mp3_file.save()
-
-        id3_file = ID3(file_path)
-        if cover_path:
-            with open(cover_path, "rb") as cover_file:
-                id3_file.add(
-                    APIC(
-                        mime="image/png",
-                        type=3,
-                        desc="Cover",
-                        data=cover_file.read(),
-                    )
-                )
-        if lyrics_path:
-            with open(lyrics_path, "r", encoding="utf-8") as lyrics_file:
-                lyrics = MetadataManager._lyric_file_to_text(lyrics_file)
-                id3_file.setall(
-                    "SYLT",
-                    [
-                        SYLT(
-                            encoding=Encoding.UTF8,
-                            lang="eng",
-                            format=2,
-                            type=1,
-                            text=lyrics,
-                        )
-                    ],
+    def _fill_mp3_metadata(file_path, metadata, cover, lyrics):
+        from mutagen.id3 import (
+            ID3,
+            ID3NoHeaderError,
+            APIC,
+            SYLT,
+            TALB,
+            TIT2,
+            TPE1,
+            TPE2,
+            TRCK,
+            Encoding,
+        )
+
+        # 所有 frame 在同一次開啟/儲存中寫入
+        try:
+            id3_file = ID3(file_path)
+        except ID3NoHeaderError:
+            id3_file = ID3()
+        id3_file.setall(
+            "TALB", [TALB(encoding=Encoding.UTF8, text=metadata.get("album", ""))]
+        )
+        id3_file.setall(
+            "TIT2", [TIT2(encoding=Encoding.UTF8, text=metadata.get("title", ""))]
+        )
+        id3_file.setall(
+            "TPE1", [TPE1(encoding=Encoding.UTF8, text=metadata.get("artist", ""))]
+        )
+        id3_file.setall(
+            "TPE2", [TPE2(encoding=Encoding.UTF8, text=metadata.get("albumartist", ""))]
+        )
+        id3_file.setall(
+            "TRCK",
+            [TRCK(encoding=Encoding.UTF8, text=str(metadata.get("tracknumber", 1)))],
+        )
+        # 沿用其他專輯的文件時，先前的封面與歌詞也要替換或移除
+        id3_file.delall("APIC")
+        id3_file.delall("SYLT")
+        if cover:
+            id3_file.add(
+                APIC(
+                    mime=cover.mime,
+                    type=3,
+                    desc="Cover",
+                    data=cover.data,
                 )
-        id3_file.save()
+            )
+        synced = MetadataManager.parse_lrc(lyrics) if lyrics else None
+        if synced:
+            id3_file.setall(
+                "SYLT",
+                [
+                    SYLT(
+                        encoding=Encoding.UTF8,
+                        lang="eng",
+                        format=2,
+                        type=1,
+                        text=synced,
+                    )
+                ],
+            )
+        id3_file.save(file_path, padding=MetadataManager._keep_padding)
 
     @staticmethod
-    def _fill_flac_metadata(file_path, metadata, cover_path, lyrics_path):
+    def _fill_flac_metadata(file_path, metadata, cover, lyrics):
+        from mutagen.flac import FLAC, Picture
+
         flac_file = FLAC(file_path)
         flac_file["album"] = metadata.get("album", "")
         flac_file["title"] = metadata.get("title", "")
         flac_file["artist"] = metadata.get("artist", "")
         flac_file["albumartist"] = metadata.get("albumartist", "")
         flac_file["tracknumber"] = str(metadata.get("tracknumber", 1))
+        # 移除轉檔時的佔位 comment，空出的空間留給封面與歌詞
+        if MetadataManager.RESERVED_KEY in flac_file:
+            del flac_file[MetadataManager.RESERVED_KEY]
 
-        if cover_path:
+        # 沿用其他專輯的文件時，先前的封面與歌詞也要替換或移除
+        flac_file.clear_pictures()
+        if "lyrics" in flac_file:
+            del flac_file["lyrics"]
+        if cover:
             image = Picture()
-            with open(cover_path, "rb") as cover_file:
-                image.data = cover_file.read()
-            with Image.open(cover_path) as img:
-                image.width, image.height = img.size
-                image.type = 3
-                image.mime = "image/png"
-                image.depth = 24
+            image.data = cover.data
+            image.width = cover.width
+            image.height = cover.height
+            image.type = 3
+            image.mime = cover.mime
+            image.depth = cover.depth
             flac_file.add_picture(image)
 
-        if lyrics_path:
-            with open(lyrics_path, "r", encoding="utf-8") as lyrics_file:
-                flac_file["lyrics"] = lyrics_file.read()
+        if lyrics:
+            flac_file["lyrics"] = lyrics
+
+        flac_file.save(padding=MetadataManager._keep_padding)
+
+
+def _syncsafe(value):
+    return bytes((value >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
 
-        flac_file.save()
+def _syncsafe_decode(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
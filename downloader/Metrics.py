@@ -0,0 +1,204 @@
+import json
+import os
+import time
+import bisect
+import threading
+import contextlib
+
+
+class Metrics:
+    """
+    各處理階段的指標：延遲直方圖、bytes 計數、進行中數量與錯誤計數。
+    下載、轉檔與寫入標籤都由同一個事件迴圈發起（轉檔在行程池中執行，
+    計時在主行程等待結果的地方進行），因此所有行程的工作都彙整在這裡。
+    可透過 Prometheus 文字格式的 HTTP 端點或定期寫出的 JSON 快照取得。
+    """
+
+    PREFIX = "siren"
+    # 秒，涵蓋 API 請求到大型 WAV 轉檔
+    BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        # {(名稱, 標籤): [各 bucket 次數, 總和, 次數]}
+        self.histograms = {}
+        self.server = None
+        self._snapshot_stop = None
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def add_gauge(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(self.BUCKETS), 0.0, 0]
+            index = bisect.bisect_left(self.BUCKETS, value)
+            if index < len(self.BUCKETS):
+                histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextlib.contextmanager
+    def track(self, stage):
+        """
+        量測一段處理：進行中數量、耗時與失敗次數。
+        :param stage: 階段名稱，如 "api"、"download"、"transcode"、"cover"、"tag"。
+        """
+        self.add_gauge("in_flight", 1, stage=stage)
+        started = time.perf_counter()
+        try:
+            yield
+        except InterruptedError:
+            raise
+        except Exception as e:
+            self.inc("errors_total", stage=stage, error=type(e).__name__)
+            raise
+        finally:
+            self.add_gauge("in_flight", -1, stage=stage)
+            self.observe("stage_seconds", time.perf_counter() - started, stage=stage)
+
+    def snapshot(self):
+        def labeled(items):
+            return [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in items
+            ]
+
+        with self.lock:
+            counters = labeled(self.counters.items())
+            gauges = labeled(self.gauges.items())
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "buckets": dict(zip(map(str, self.BUCKETS), list(buckets))),
+                    "sum": total,
+                    "count": count,
+                }
+                for (name, labels), (buckets, total, count) in self.histograms.items()
+            ]
+        return {
+            "timestamp": time.time(),
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms,
+        }
+
+    def render_prometheus(self):
+        def labels_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (
+                (key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                for key, value in pairs
+            )
+            return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+        lines = []
+        with self.lock:
+            for kind, metrics in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in metrics}):
+                    lines.append(f"# TYPE {self.PREFIX}_{name} {kind}")
+                    for (metric, labels), value in metrics.items():
+                        if metric == name:
+                            lines.append(
+                                f"{self.PREFIX}_{name}{labels_text(labels)} {value}"
+                            )
+            for name in sorted({name for name, _ in self.histograms}):
+                full_name = f"{self.PREFIX}_{name}"
+                lines.append(f"# TYPE {full_name} histogram")
+                for (metric, labels), (
+                    buckets,
+                    total,
+                    count,
+                ) in self.histograms.items():
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, bucket in zip(self.BUCKETS, buckets):
+                        cumulative += bucket
+                        lines.append(
+                            f"{full_name}_bucket"
+                            f"{labels_text(labels, [('le', bound)])} {cumulative}"
+                        )
+                    lines.append(
+                        f"{full_name}_bucket{labels_text(labels, [('le', '+Inf')])} "
+                        f"{count}"
+                    )
+                    lines.append(f"{full_name}_sum{labels_text(labels)} {total}")
+                    lines.append(f"{full_name}_count{labels_text(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        在背景執行緒提供 Prometheus 文字格式的 /metrics 端點。
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address
+
+    def write_snapshot(self, path):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temp_path, path)
+
+    def start_snapshots(self, path, interval=10):
+        """
+        在背景執行緒每隔 interval 秒把 JSON 快照寫入 path（先寫暫存檔再取代）。
+        """
+        self._snapshot_stop = threading.Event()
+
+        def loop():
+            while not self._snapshot_stop.wait(interval):
+                self.write_snapshot(path)
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self._snapshot_stop is not None:
+            self._snapshot_stop.set()
+            self._snapshot_stop = None
@@ -1,14 +1,66 @@
 import json
-import requests
+import asyncio
+import threading
 from pathlib import Path
 from .my_logger import get_mp_main_logger
 from .TaskManager import TaskManager
-from .DownloadWorker import DownloadWorker
+from .StateStore import StateStore
+from .ResponseCache import ResponseCache
+from .RetryPolicy import RetryPolicy
+from .HttpClient import HttpClient
+from .Metrics import Metrics
+from .ProgressTracker import ProgressTracker
+from .LibraryIndex import LibraryIndex
+from .DownloadPlanner import DownloadPlanner
+from .DownloadWorker import DownloadWorker, API_BASE
 
 
 class MonsterSirenDownloader:
-    def __init__(self, download_dir="./MonsterSiren/", max_workers=None):
+    def __init__(
+        self,
+        download_dir="./MonsterSiren/",
+        max_workers=None,
+        max_concurrency=64,
+        min_concurrency=4,
+        bandwidth_limit=None,
+        segments=4,
+        min_segment_size=8 * 1024 * 1024,
+        tag_workers=4,
+        metadata_workers=16,
+        queue_size=16,
+        stream_transcode=False,
+        api_cache_ttl=3600,
+        cover_format="png",
+        cover_max_size=None,
+        connect_timeout=10,
+        read_timeout=30,
+        stall_timeout=60,
+        retries=4,
+        hedge_delay=None,
+        api_base=API_BASE,
+        metrics_port=None,
+        metrics_path=None,
+        metrics_interval=10,
+        stop_timeout=1.0,
+        lyrics_sidecar=True,
+    ):
         self.directory = Path(download_dir)
+        self.segments = segments
+        self.min_segment_size = min_segment_size
+        self.tag_workers = tag_workers
+        self.metadata_workers = metadata_workers
+        self.queue_size = queue_size
+        self.stream_transcode = stream_transcode
+        self.cover_format = cover_format
+        self.cover_max_size = cover_max_size
+        self.stall_timeout = stall_timeout
+        self.retries = retries
+        self.hedge_delay = hedge_delay
+        self.library_index = None
+        self.api_base = api_base
+        self.metrics_path = metrics_path
+        self.stop_timeout = stop_timeout
+        self.lyrics_sidecar = lyrics_sidecar
         self.directory.mkdir(parents=True, exist_ok=True)
 
         self.main_logger, self.queue_listener, self.log_queue = get_mp_main_logger(
@@ -16,62 +68,230 @@ class MonsterSirenDownloader:
             to_console=True,
             to_file=self.directory / "Log.log",
         )
-        self.task_manager = TaskManager(self.log_queue, max_workers)
+        self.state_store = StateStore(self.directory / "state.db")
+        self.response_cache = ResponseCache(
+            self.directory / "api_cache.db", ttl=api_cache_ttl
+        )
+        self.task_manager = TaskManager(self.log_queue, max_workers, max_concurrency)
+        # run() 執行中時，資料庫改由 run() 結束時關閉，stop() 逾時返回也不會被中途關閉
+        self.running = False
+        self.close_lock = threading.Lock()
+        self.metrics = Metrics()
+        # 訂閱 progress 即可收到每首歌的階段、bytes 進度、速度與 ETA
+        self.progress = ProgressTracker()
+        if metrics_port is not None:
+            host, port = self.metrics.serve(metrics_port)
+            self.main_logger.info(f"Serving metrics at http://{host}:{port}/metrics")
+        if metrics_path is not None:
+            self.metrics.start_snapshots(metrics_path, metrics_interval)
+        self.http_client = HttpClient(
+            max_concurrency=max_concurrency,
+            min_concurrency=min_concurrency,
+            bandwidth_limit=bandwidth_limit,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            metrics=self.metrics,
+            log_queue=self.log_queue,
+        )
 
     def run(self):
+        with self.close_lock:
+            self.running = True
+        try:
+            self._run()
+        finally:
+            with self.close_lock:
+                self.running = False
+                if self.task_manager.stop_event.is_set():
+                    # stop() 已在等待逾時後返回，由這裡關閉資料庫
+                    self._close_stores()
+
+    def _run(self):
         # 初始化下載任務
-        self.all_albums = self.get_albums()
-        self.unfinished_albums = self.compare_ablums(
-            self.all_albums, self.directory / "completed_albums.json"
-        )
-        for unfinished_album in self.unfinished_albums:
-            unfinished_album["log_queue"] = self.log_queue
-        tasks = self.unfinished_albums
+        tasks = self._pending_albums()
+        if not tasks:
+            # 沒有待處理的專輯時不啟動事件迴圈、轉檔行程與連線池
+            self.main_logger.info("Nothing to download")
+            self.progress.flush()
+            self.library_index.save()
+            return
 
         # 開始下載
-        worker = DownloadWorker(
-            directory=self.directory,
-            stop_event=self.task_manager.stop_event,
-            mutex=self.task_manager.mutex,
-        )
+        worker = self._create_worker()
         try:
-            self.task_manager.start(tasks, worker.download_album)
+            self.task_manager.start(
+                tasks,
+                worker.prepare_album,
+                worker.pipeline_stages(),
+                context=worker,
+                queue_size=self.queue_size,
+            )
         except KeyboardInterrupt:
             self.main_logger.warning("Interrupted! Stopping downloads...")
             self.task_manager.stop()
+        finally:
+            self.progress.flush()
+            self.library_index.save()
+            if self.metrics_path is not None:
+                self.metrics.write_snapshot(self.metrics_path)
+
+    def plan(self, bandwidth=None, cores=None):
+        """
+        試算模式：不下載音訊，只估算待下載的 bytes、轉檔數量與所需時間。
+        :param bandwidth: 估算用的下載頻寬（bytes/秒），預設為 bandwidth_limit。
+        :param cores: 估算用的轉檔核心數，預設為 max_workers。
+        :return: DownloadPlanner.plan 的統計結果。
+        """
+        tasks = self._pending_albums()
+        bandwidth = bandwidth or self.http_client.bandwidth_limit
+        planner = DownloadPlanner(self._create_worker(), self.log_queue)
+        try:
+            result = asyncio.run(planner.plan(tasks, bandwidth, cores))
+        finally:
+            self.library_index.save()
+
+        self.main_logger.info(
+            f"Plan: {result['songs']} songs in {result['albums']} albums - "
+            f"{result['download']} to download, {result['resume']} to resume, "
+            f"{result['reuse']} reused from other albums, "
+            f"{result['retag']} to retag, {result['skip']} already done"
+        )
+        self.main_logger.info(
+            f"Plan: {result['download_bytes'] / 1024 / 1024:.1f} MiB to download"
+            + (
+                f" ({result['unknown_size']} songs of unknown size)"
+                if result["unknown_size"]
+                else ""
+            )
+            + f", {result['transcodes']} WAV to FLAC transcodes"
+        )
+        if result["eta_seconds"] is None:
+            self.main_logger.info(
+                f"Plan: transcoding takes ~{result['transcode_seconds']:.0f}s "
+                f"on {result['cores']} cores; pass a bandwidth for a full ETA"
+            )
+        else:
+            self.main_logger.info(
+                f"Plan: ETA ~{result['eta_seconds']:.0f}s at "
+                f"{result['bandwidth'] / 1024 / 1024:.1f} MiB/s on "
+                f"{result['cores']} cores (download "
+                f"{result['download_seconds']:.0f}s, transcode "
+                f"{result['transcode_seconds']:.0f}s)"
+            )
+        return result
+
+    def _pending_albums(self):
+        self.all_albums = self.get_albums()
+        self.library_index = LibraryIndex(
+            self.directory, self.state_store, self.log_queue
+        ).scan()
+        self.unfinished_albums = self.compare_ablums(self.all_albums)
+        return self.unfinished_albums
+
+    def _create_worker(self):
+        return DownloadWorker(
+            directory=self.directory,
+            stop_event=self.task_manager.stop_event,
+            state_store=self.state_store,
+            response_cache=self.response_cache,
+            http_client=self.http_client,
+            log_queue=self.log_queue,
+            library_index=self.library_index,
+            api_base=self.api_base,
+            max_workers=self.task_manager.max_workers,
+            segments=self.segments,
+            min_segment_size=self.min_segment_size,
+            tag_workers=self.tag_workers,
+            metadata_workers=self.metadata_workers,
+            stream_transcode=self.stream_transcode,
+            cover_format=self.cover_format,
+            cover_max_size=self.cover_max_size,
+            stall_timeout=self.stall_timeout,
+            retries=self.retries,
+            hedge_delay=self.hedge_delay,
+            progress=self.progress,
+            lyrics_sidecar=self.lyrics_sidecar,
+        )
 
     def get_albums(self):
         # 從 API 獲取專輯列表
-        session = requests.Session()
-        response = session.get(
-            "https://monster-siren.hypergryph.com/api/albums",
-            headers={"Accept": "application/json"},
-        )
+        url = f"{self.api_base}/albums"
+        cached = self.response_cache.get(url)
+        if self.response_cache.is_fresh(cached):
+            self.main_logger.info("Using cached album list")
+            return json.loads(cached["body"])["data"]
+
+        headers = {"Accept": "application/json"}
+        headers.update(self.response_cache.revalidation_headers(cached))
         self.main_logger.info("Getting album list from API")
+
+        def fetch():
+            response = self.http_client.get_sync(url, headers=headers)
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+
+        response = RetryPolicy(attempts=self.retries + 1).run_sync(
+            fetch, url, self.main_logger
+        )
+        if response.status_code == 304 and cached:
+            self.response_cache.touch(url)
+            return json.loads(cached["body"])["data"]
+        response.raise_for_status()
+        self.response_cache.put(url, response.content, response.headers)
         return response.json()["data"]
 
-    def compare_ablums(self, all_albums, completed_list_path):
+    def compare_ablums(self, all_albums):
         # 比較已下載的專輯和所有專輯，返回未完成的專輯
-        if not completed_list_path.exists():
-            with open(completed_list_path, "w+", encoding="utf8") as f:
-                json.dump([], f)
-            self.main_logger.info("Adding all albums to download queue")
-            return all_albums
-
-        with open(completed_list_path, "r", encoding="utf8") as f:
-            completed_albums = json.load(f)
-
-        unfinished_albums = []
-        for album in all_albums:
-            if album["name"] not in completed_albums:
-                unfinished_albums.append(album)
+        imported = self.state_store.import_completed_json(
+            self.directory / "completed_albums.json", all_albums
+        )
+        if imported:
+            self.main_logger.info(
+                f"Imported {imported} albums from completed_albums.json"
+            )
+
+        completed = self.state_store.completed_albums()
+        # 完成後在 API 中改名的專輯重新加入，既有文件會搬到新的專輯目錄
+        renamed = {
+            album["cid"]
+            for album in all_albums
+            if album["cid"] in completed and completed[album["cid"]] != album["name"]
+        }
+        if renamed:
+            self.main_logger.info(
+                f"{len(renamed)} completed albums were renamed, relocating"
+            )
+        completed_cids = set(completed) - renamed
+        if self.library_index is not None:
+            # 已完成但文件被刪除、變更或搬到其他目錄的專輯重新加入，
+            # 仍找得到的歌曲會逐首略過或搬回
+            missing = self.library_index.missing_albums() & completed_cids
+            if missing:
+                self.main_logger.info(
+                    f"{len(missing)} completed albums have missing files, rechecking"
+                )
+            completed_cids -= missing
+        unfinished_albums = [
+            album for album in all_albums if album["cid"] not in completed_cids
+        ]
         self.main_logger.info(
             f"Adding {len(unfinished_albums)} albums to download queue"
         )
         return unfinished_albums
 
+    def _close_stores(self):
+        self.state_store.close()
+        self.response_cache.close()
+
     def stop(self):
-        self.task_manager.stop()
+        # 最多等待 stop_timeout 秒，GUI 按下停止後可立即回應
+        self.task_manager.stop(self.stop_timeout)
+        with self.close_lock:
+            if not self.running:
+                self._close_stores()
+        self.http_client.close()
+        self.metrics.close()
         self.main_logger.info("MonsterSirenDownloader stopped.")
         if self.queue_listener:
             self.queue_listener.stop()
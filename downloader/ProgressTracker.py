@@ -0,0 +1,198 @@
+import time
+import threading
+from collections import deque
+
+
+class FileProgress:
+    """
+    單一文件的下載進度，同時更新 ProgressTracker 與選填的 tqdm 進度條。
+    """
+
+    def __init__(self, tracker, key, bar=None):
+        self.tracker = tracker
+        self.key = key
+        self.bar = bar
+
+    def update(self, size):
+        self.tracker.advance(self.key, size)
+        if self.bar is not None:
+            self.bar.update(size)
+
+    def close(self):
+        if self.bar is not None:
+            self.bar.close()
+
+
+class ProgressTracker:
+    """
+    下載進度的事件通道：worker 回報每首歌的階段與已下載的 bytes，
+    訂閱者（GUI、CLI）收到合併後的快照，而不是每個事件各收一次。
+    所有事件都在事件迴圈中回報；訂閱者的 callback 也在該執行緒呼叫，
+    應只保存快照，再由自己的執行緒（如 Tk 的 after()）更新畫面。
+    """
+
+    # 最短的通知間隔（秒）
+    NOTIFY_INTERVAL = 0.1
+    # 計算速度的時間窗（秒）
+    SPEED_WINDOW = 5.0
+    # 下載佔一首歌進度的比例，其餘為轉檔與寫入標籤
+    DOWNLOAD_WEIGHT = 0.8
+    STAGE_PROGRESS = {"transcode": 0.8, "tag": 0.95}
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.songs = {}
+        self.songs_total = 0
+        self.songs_done = 0
+        self.songs_failed = 0
+        self.bytes_received = 0
+        self.bytes_finished = 0
+        self.sized_finished = 0
+        self.samples = deque()
+        self.started = time.monotonic()
+        self.last_notify = 0.0
+
+    def subscribe(self, callback):
+        """
+        :param callback: 接收 snapshot() 結果的函式，最多每 NOTIFY_INTERVAL 秒呼叫一次。
+        """
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def add(self, key, name):
+        """
+        登記一首待處理的歌曲。
+        :param key: 歌曲的識別鍵（專輯目錄/歌名）。
+        :param name: 顯示用的歌名。
+        """
+        with self.lock:
+            self.songs[key] = {
+                "name": name,
+                "stage": "queued",
+                "done": 0,
+                "total": None,
+            }
+            self.songs_total += 1
+        self._notify()
+
+    def stage(self, key, stage):
+        with self.lock:
+            song = self.songs.get(key)
+            if song is not None:
+                song["stage"] = stage
+        self._notify()
+
+    def file(self, key, total, initial=0, bar=None):
+        """
+        開始（或續傳）下載一首歌的文件。
+        :param total: 文件總 bytes 數，0 表示未知。
+        :param initial: 已存在於暫存檔的 bytes 數。
+        :param bar: 選填的 tqdm 進度條。
+        :return: FileProgress
+        """
+        with self.lock:
+            song = self.songs.get(key)
+            if song is not None:
+                song["done"] = initial
+                song["total"] = total or None
+        self._notify()
+        return FileProgress(self, key, bar)
+
+    def advance(self, key, size):
+        with self.lock:
+            song = self.songs.get(key)
+            if song is not None:
+                song["done"] += size
+            self.bytes_received += size
+        self._notify()
+
+    def finish(self, key, success):
+        with self.lock:
+            song = self.songs.pop(key, None)
+            if success:
+                self.songs_done += 1
+            else:
+                self.songs_failed += 1
+            if song is not None and song["total"]:
+                self.bytes_finished += song["total"]
+                self.sized_finished += 1
+        self._notify()
+
+    def snapshot(self):
+        """
+        :return: dict，包含歌曲數、bytes 數、下載速度（bytes/秒）、
+                 預估剩餘秒數（無法估算時為 None）、完成比例與進行中的歌曲。
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.samples.append((now, self.bytes_received))
+            while (
+                len(self.samples) > 2 and now - self.samples[0][0] > self.SPEED_WINDOW
+            ):
+                self.samples.popleft()
+            first_time, first_bytes = self.samples[0]
+            elapsed = now - first_time
+            speed = (self.bytes_received - first_bytes) / elapsed if elapsed else 0.0
+
+            active = [dict(song, key=key) for key, song in self.songs.items()]
+            finished = self.songs_done + self.songs_failed
+            partial = sum(self._song_progress(song) for song in active)
+            fraction = (
+                (finished + partial) / self.songs_total if self.songs_total else 0.0
+            )
+
+            # 剩餘量：已知大小的歌曲按實際剩餘，其餘以已完成歌曲的平均大小估算
+            average = (
+                self.bytes_finished / self.sized_finished
+                if self.sized_finished
+                else None
+            )
+            remaining = 0
+            for song in active:
+                if song["total"]:
+                    remaining += max(song["total"] - song["done"], 0)
+                elif average is not None:
+                    remaining += average
+                else:
+                    remaining = None
+                    break
+            eta = remaining / speed if remaining is not None and speed > 0 else None
+            if not active:
+                eta = 0.0 if finished == self.songs_total else eta
+
+            return {
+                "songs_total": self.songs_total,
+                "songs_done": self.songs_done,
+                "songs_failed": self.songs_failed,
+                "bytes_received": self.bytes_received,
+                "speed": speed,
+                "eta": eta,
+                "fraction": fraction,
+                "elapsed": now - self.started,
+                "active": active,
+            }
+
+    def _song_progress(self, song):
+        if song["stage"] in self.STAGE_PROGRESS:
+            return self.STAGE_PROGRESS[song["stage"]]
+        if song["total"]:
+            return self.DOWNLOAD_WEIGHT * min(song["done"] / song["total"], 1.0)
+        return 0.0
+
+    def flush(self):
+        """立即通知所有訂閱者，例如全部任務結束時。"""
+        self._notify(force=True)
+
+    def _notify(self, force=False):
+        if not self.subscribers:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_notify < self.NOTIFY_INTERVAL:
+            return
+        self.last_notify = now
+        snapshot = self.snapshot()
+        for callback in list(self.subscribers):
+            callback(snapshot)
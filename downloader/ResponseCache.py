@@ -0,0 +1,89 @@
+import sqlite3
+import threading
+import time
+
+
+class ResponseCache:
+    """
+    API 回應的磁碟快取，以 URL 為鍵。
+    在 TTL 內直接使用快取內容；過期後帶 ETag / Last-Modified 重新驗證，
+    伺服器回應 304 時沿用快取內容並重設 TTL。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, db_path, ttl=3600):
+        """
+        :param db_path: 快取資料庫路徑，不存在時會自動建立。
+        :param ttl: 快取內容不需重新驗證的秒數，0 表示每次都重新驗證。
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            str(db_path), check_same_thread=False, isolation_level=None
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, etag, last_modified, fetched_at "
+                "FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("body", "etag", "last_modified", "fetched_at")
+        return dict(zip(keys, row))
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry["fetched_at"] < self.ttl
+
+    def revalidation_headers(self, entry):
+        headers = {}
+        if entry is None:
+            return headers
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, body, headers):
+        """
+        :param headers: 回應標頭（requests 與 aiohttp 的標頭皆可）。
+        """
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(url, body, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    url,
+                    body,
+                    headers.get("etag"),
+                    headers.get("last-modified"),
+                    time.time(),
+                ),
+            )
+
+    def touch(self, url):
+        # 304 Not Modified: 內容未變，只更新取得時間
+        with self.lock:
+            self.conn.execute(
+                "UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url)
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,93 @@
+import sys
+import time
+import random
+import asyncio
+
+
+class RetryPolicy:
+    """
+    暫時性錯誤的重試策略：指數退避加上 full jitter，避免大量請求同時重試；
+    429 / 503 帶有 Retry-After 時至少等待伺服器要求的秒數。
+    """
+
+    RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+    def __init__(self, attempts=4, base_delay=0.5, max_delay=30.0, retryable=()):
+        """
+        :param attempts: 最多嘗試次數（含第一次）。
+        :param base_delay: 第一次重試前的最長等待秒數，之後每次加倍。
+        :param max_delay: 單次等待的上限秒數。
+        :param retryable: 額外視為暫時性錯誤的例外類型。
+        """
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable = tuple(retryable)
+
+    @staticmethod
+    def _libraries():
+        # 不主動載入 aiohttp / requests：尚未載入的函式庫不可能產生它的例外
+        return sys.modules.get("aiohttp"), sys.modules.get("requests")
+
+    @staticmethod
+    def _status(error):
+        # aiohttp 與 requests 的 HTTP 錯誤各自帶有狀態碼與回應標頭
+        aiohttp, requests = RetryPolicy._libraries()
+        if aiohttp and isinstance(error, aiohttp.ClientResponseError):
+            return error.status, error.headers
+        response = getattr(error, "response", None)
+        if requests and isinstance(error, requests.HTTPError) and response is not None:
+            return response.status_code, response.headers
+        return None, None
+
+    def should_retry(self, error):
+        status, _ = self._status(error)
+        if status is not None:
+            return status in self.RETRY_STATUSES
+        aiohttp, requests = self._libraries()
+        transient = (asyncio.TimeoutError,) + self.retryable
+        if aiohttp:
+            transient += (aiohttp.ClientError,)
+        if requests:
+            transient += (requests.ConnectionError, requests.Timeout)
+        return isinstance(error, transient)
+
+    def delay(self, attempt, error=None):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        _, headers = self._status(error)
+        retry_after = headers.get("retry-after") if headers else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(int(retry_after), self.max_delay))
+        return delay
+
+    async def run(self, function, description, logger):
+        """
+        :param function: 無參數的協程函式，每次嘗試都重新呼叫。
+        :param description: 日誌中顯示的請求描述。
+        """
+        for attempt in range(self.attempts):
+            try:
+                return await function()
+            except Exception as e:
+                if attempt + 1 >= self.attempts or not self.should_retry(e):
+                    raise
+                delay = self.delay(attempt, e)
+                logger.warning(
+                    f"請求失敗，{delay:.1f} 秒後重試 ({attempt + 1}/{self.attempts - 1}): "
+                    f"{description} - {type(e).__name__}: {e}"
+                )
+                await asyncio.sleep(delay)
+
+    def run_sync(self, function, description, logger):
+        for attempt in range(self.attempts):
+            try:
+                return function()
+            except Exception as e:
+                if attempt + 1 >= self.attempts or not self.should_retry(e):
+                    raise
+                delay = self.delay(attempt, e)
+                logger.warning(
+                    f"請求失敗，{delay:.1f} 秒後重試 ({attempt + 1}/{self.attempts - 1}): "
+                    f"{description} - {type(e).__name__}: {e}"
+                )
+                time.sleep(delay)
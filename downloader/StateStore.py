@@ -0,0 +1,257 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class StateStore:
+    """
+    以 SQLite (WAL) 記錄專輯與歌曲的下載狀態，以 cid 為鍵。
+    每次更新只寫入一列並立即提交，不需重寫整個檔案。
+    """
+
+    COMPLETED = "completed"
+    DOWNLOADED = "downloaded"
+    FAILED = "failed"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS albums (
+            cid TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            status TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS albums_status ON albums (status);
+        CREATE TABLE IF NOT EXISTS songs (
+            cid TEXT PRIMARY KEY,
+            album_cid TEXT NOT NULL,
+            name TEXT NOT NULL,
+            status TEXT NOT NULL,
+            path TEXT,
+            bytes INTEGER,
+            checksum TEXT,
+            source_url TEXT,
+            etag TEXT,
+            file_size INTEGER,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS songs_album ON songs (album_cid);
+        CREATE TABLE IF NOT EXISTS library_files (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            tracknumber INTEGER
+        );
+    """
+
+    # 舊版資料庫缺少的欄位與其後建立的索引
+    MIGRATIONS = {"source_url": "TEXT", "etag": "TEXT", "file_size": "INTEGER"}
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS songs_source ON songs (source_url);
+        CREATE INDEX IF NOT EXISTS songs_checksum ON songs (checksum);
+    """
+
+    def __init__(self, db_path):
+        """
+        :param db_path: 資料庫檔案路徑，不存在時會自動建立。
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        # isolation_level=None: 每個寫入各自提交，檢查點成本固定
+        self.conn = sqlite3.connect(
+            str(db_path), check_same_thread=False, isolation_level=None
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(songs)")}
+        for column, column_type in self.MIGRATIONS.items():
+            if column not in columns:
+                self.conn.execute(
+                    f"ALTER TABLE songs ADD COLUMN {column} {column_type}"
+                )
+        self.conn.executescript(self.INDEXES)
+
+    def mark_album(self, cid, name, status):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO albums (cid, name, status, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (cid, name, status, time.time()),
+            )
+
+    def mark_song(
+        self,
+        cid,
+        album_cid,
+        name,
+        status,
+        path=None,
+        size=None,
+        checksum=None,
+        source_url=None,
+        etag=None,
+        file_size=None,
+    ):
+        # 未提供的欄位沿用先前記錄的值
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO songs "
+                "(cid, album_cid, name, status, path, bytes, checksum, "
+                "source_url, etag, file_size, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (cid) DO UPDATE SET "
+                "album_cid = excluded.album_cid, name = excluded.name, "
+                "status = excluded.status, "
+                "path = COALESCE(excluded.path, path), "
+                "bytes = COALESCE(excluded.bytes, bytes), "
+                "checksum = COALESCE(excluded.checksum, checksum), "
+                "source_url = COALESCE(excluded.source_url, source_url), "
+                "etag = COALESCE(excluded.etag, etag), "
+                "file_size = COALESCE(excluded.file_size, file_size), "
+                "updated_at = excluded.updated_at",
+                (
+                    cid,
+                    album_cid,
+                    name,
+                    status,
+                    str(path) if path is not None else None,
+                    size,
+                    checksum,
+                    source_url,
+                    etag,
+                    file_size,
+                    time.time(),
+                ),
+            )
+
+    def completed_albums(self):
+        """
+        :return: 已完成專輯 {cid: 完成時的專輯名稱}。
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT cid, name FROM albums WHERE status = ?", (self.COMPLETED,)
+            ).fetchall()
+        return dict(rows)
+
+    def get_song(self, cid):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT cid, album_cid, name, status, path, bytes, checksum, "
+                "source_url, etag, file_size FROM songs WHERE cid = ?",
+                (cid,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = (
+            "cid",
+            "album_cid",
+            "name",
+            "status",
+            "path",
+            "bytes",
+            "checksum",
+            "source_url",
+            "etag",
+            "file_size",
+        )
+        return dict(zip(keys, row))
+
+    def completed_song_files(self):
+        """
+        :return: 已完成歌曲的 [(專輯 cid, 相對路徑, 文件大小)]。
+        """
+        with self.lock:
+            return self.conn.execute(
+                "SELECT album_cid, path, file_size FROM songs "
+                "WHERE status = ? AND path IS NOT NULL",
+                (self.COMPLETED,),
+            ).fetchall()
+
+    def library_tracks(self):
+        """
+        :return: 快取的標籤讀取結果 {相對路徑: (大小, mtime_ns, 曲目編號)}。
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, size, mtime_ns, tracknumber FROM library_files"
+            ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def put_library_tracks(self, rows):
+        """
+        :param rows: [(相對路徑, 大小, mtime_ns, 曲目編號)]。
+        """
+        self._executemany(
+            "INSERT OR REPLACE INTO library_files "
+            "(path, size, mtime_ns, tracknumber) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+
+    def find_completed_song(self, source_url=None, checksum=None):
+        """
+        尋找來源相同且已完成的歌曲，用於跨專輯重複使用已下載的內容。
+        :param source_url: 來源網址。
+        :param checksum: 來源內容的 sha256。
+        :return: 最近完成的一筆 (cid, path, bytes, checksum, etag)，找不到時為 None。
+        """
+        column, value = (
+            ("source_url", source_url) if source_url else ("checksum", checksum)
+        )
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT cid, path, bytes, checksum, etag FROM songs "
+                f"WHERE {column} = ? AND status = ? AND path IS NOT NULL "
+                "ORDER BY updated_at DESC LIMIT 1",
+                (value, self.COMPLETED),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("cid", "path", "bytes", "checksum", "etag")
+        return dict(zip(keys, row))
+
+    def import_completed_json(self, json_path, all_albums):
+        """
+        匯入舊版以專輯名稱記錄的 completed_albums.json，匯入後改名為
+        completed_albums.json.imported，避免重複匯入。
+        :param json_path: 舊版 JSON 檔路徑。
+        :param all_albums: API 回傳的專輯列表，用於把名稱對應到 cid。
+        :return: 匯入的專輯數量。
+        """
+        if not json_path.exists():
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf8") as f:
+                completed_names = set(json.load(f))
+        except Exception:
+            completed_names = set()
+
+        now = time.time()
+        rows = [
+            (album["cid"], album["name"], self.COMPLETED, now)
+            for album in all_albums
+            if album["name"] in completed_names
+        ]
+        self._executemany(
+            "INSERT OR REPLACE INTO albums (cid, name, status, updated_at) "
+            "VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        json_path.rename(json_path.with_name(f"{json_path.name}.imported"))
+        return len(rows)
+
+    def _executemany(self, sql, rows):
+        # 多筆寫入合併為一個交易；失敗時回復，連線不會停留在未結束的交易中
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(sql, rows)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
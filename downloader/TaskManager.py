@@ -1,49 +1,131 @@
 from .my_logger import get_mp_child_logger
 import os
-import multiprocessing
-from multiprocessing import Pool
+import asyncio
+import threading
 
 
 class TaskManager:
-    def __init__(self, log_queue=None, max_workers=None):
+    def __init__(self, log_queue=None, max_workers=None, max_concurrency=64):
         self.max_workers = max_workers or os.cpu_count()
-        self.stop_event = multiprocessing.Manager().Event()
-        self.mutex = multiprocessing.Manager().Lock()
-        self.pool = None
+        self.max_concurrency = max_concurrency
+        # 停止旗標只在本行程的事件迴圈中讀取，不需 Manager 伺服器行程
+        self.stop_event = threading.Event()
+        self.running = False
+        self._loop = None
+        self._main_task = None
+        self._finished = threading.Event()
+        self._finished.set()
 
         # 初始化 logger
         self.logger = get_mp_child_logger(log_queue=log_queue, name=__name__)
-        self.logger.info(f"TaskManager 初始化完成，最大執行緒數: {self.max_workers}")
+        self.logger.info(
+            f"TaskManager 初始化完成，轉檔行程數: {self.max_workers}，"
+            f"最大同時傳輸數: {self.max_concurrency}"
+        )
 
-    def start(self, tasks, worker_function):
-        self.logger.info("啟動執行緒池，分配任務...")
-        self.pool = Pool(self.max_workers)
+    def start(self, tasks, prepare_function, stages, context=None, queue_size=16):
+        """
+        在單一行程的事件迴圈中以多階段管線執行所有任務。
+        :param tasks: 任務列表（如專輯），每個元素會傳給 prepare_function。
+        :param prepare_function: 協程函式，回傳 (結果 future, 子任務列表)；
+                                 子任務會放入第一個階段的佇列，結果 future 解析為 True/False。
+        :param stages: [(階段名稱, 協程函式, 並行數)]，函式回傳要交給下一階段的子任務，
+                       回傳 None 則該子任務到此結束。
+        :param context: 選填的 async context manager（如 DownloadWorker），
+                        在所有任務開始前進入、結束後離開。
+        :param queue_size: 階段之間佇列的容量，滿了會讓上游階段暫停。
+        """
+        self.logger.info("啟動事件迴圈，分配任務...")
+        self.running = True
+        self._finished.clear()
         try:
-            results = self.pool.map(worker_function, tasks)
+            results = asyncio.run(
+                self._run_tasks(tasks, prepare_function, stages, context, queue_size)
+            )
             self.logger.info(
                 f"所有任務執行完成。成功數量: {sum(results)}, 失敗數量: {len(results) - sum(results)}"
             )
             return results
+        except asyncio.CancelledError:
+            self.logger.warning("所有任務已取消。")
+            return []
         except Exception as e:
             self.logger.exception(f"執行任務時發生錯誤: {e}")
             return []
         finally:
-            self.close_pool()
+            self._loop = None
+            self._main_task = None
+            self.running = False
+            self._finished.set()
+
+    async def _run_tasks(self, tasks, prepare_function, stages, context, queue_size):
+        # 記下事件迴圈與主任務，讓其他執行緒呼叫 stop() 時可以直接取消
+        self._loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        if self.stop_event.is_set():
+            raise asyncio.CancelledError
+        if context is None:
+            return await self._schedule(tasks, prepare_function, stages, queue_size)
+        async with context:
+            return await self._schedule(tasks, prepare_function, stages, queue_size)
+
+    async def _schedule(self, tasks, prepare_function, stages, queue_size):
+        # 第一個階段的佇列由所有任務共用，閒置的 consumer 會立即取走下一個子任務，
+        # 避免單一大型任務拖長整體時間；之後的佇列有容量上限以產生背壓
+        queues = [asyncio.Queue()] + [
+            asyncio.Queue(maxsize=queue_size) for _ in stages[1:]
+        ]
+
+        async def produce(task):
+            result, subtasks = await prepare_function(task)
+            for subtask in subtasks:
+                queues[0].put_nowait(subtask)
+            return await result
+
+        async def consume(index, function):
+            while True:
+                subtask = await queues[index].get()
+                try:
+                    subtask = await function(subtask)
+                    if subtask is not None and index + 1 < len(stages):
+                        await queues[index + 1].put(subtask)
+                finally:
+                    queues[index].task_done()
+
+        consumers = []
+        for index, (name, function, concurrency) in enumerate(stages):
+            self.logger.info(f"啟動階段 {name}，並行數: {concurrency}")
+            consumers += [
+                asyncio.create_task(consume(index, function))
+                for _ in range(concurrency)
+            ]
+        try:
+            return await asyncio.gather(*(produce(task) for task in tasks))
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
 
-    def stop(self):
-        self.logger.warning("收到停止指令，正在停止所有執行序...")
+    def stop(self, timeout=None):
+        """
+        取消所有進行中的任務：開啟中的 HTTP 回應會被中斷，轉檔行程會被結束，
+        已下載的暫存檔保留供下次續傳。
+        :param timeout: 最多等待清理完成的秒數，None 表示等到完成為止；
+                        逾時後清理仍在背景繼續。
+        """
         self.stop_event.set()
-        if self.pool:
-            # self.pool.terminate()
-            self.pool.close()
-            self.pool.join()
-            self.logger.warning("所有執行緒已停止。")
+        if not self.running:
+            # 沒有進行中的下載（試算模式、尚未開始或已結束），不需要停止任何傳輸
+            return
+        self.logger.warning("收到停止指令，正在停止所有傳輸...")
+        loop, main_task = self._loop, self._main_task
+        if loop is not None and main_task is not None:
+            try:
+                loop.call_soon_threadsafe(main_task.cancel)
+            except RuntimeError:
+                # 事件迴圈已關閉
+                pass
+        if self._finished.wait(timeout):
+            self.logger.warning("所有傳輸已停止。")
         else:
-            self.logger.warning("執行緒池尚未啟動。")
-
-    def close_pool(self):
-        if self.pool:
-            self.logger.info("正在關閉執行緒池...")
-            self.pool.close()
-            self.pool.join()
-            self.logger.info("執行緒池已關閉。")
+            self.logger.warning(f"停止逾時（{timeout} 秒），剩餘的清理在背景繼續。")
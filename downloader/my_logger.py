@@ -1,9 +1,149 @@
 # my_logger.py
+import atexit
 import logging
+import os
 import sys
+import time
+import threading
 import multiprocessing
 from logging.handlers import QueueHandler, QueueListener
 
+# 每個行程、每個佇列只建立一個 handler，重複取得 logger 時直接沿用
+_handlers = {}
+
+
+class BatchQueueHandler(QueueHandler):
+    """
+    把日誌累積成批次再放入佇列，每批只需一次序列化與一次寫入管道。
+    WARNING 以上的訊息立即送出；其餘訊息在累積 BATCH_SIZE 筆或
+    FLUSH_INTERVAL 秒後由背景執行緒送出。
+    """
+
+    BATCH_SIZE = 64
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.buffer = []
+        self.buffer_lock = threading.Lock()
+        self.pid = None
+        # 關閉後背景執行緒結束，之後的訊息立即送出
+        self.closed = threading.Event()
+
+    def _start_flusher(self):
+        # fork 出的子行程不會繼承背景執行緒，需在各行程各自啟動
+        self.pid = os.getpid()
+        self.buffer = []
+        self.closed = threading.Event()
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def _flush_loop(self):
+        pid, closed = self.pid, self.closed
+        while pid == self.pid and not closed.wait(self.FLUSH_INTERVAL):
+            self.flush()
+
+    def emit(self, record):
+        try:
+            if self.pid != os.getpid():
+                self._start_flusher()
+            record = self.prepare(record)
+            with self.buffer_lock:
+                self.buffer.append(record)
+                full = len(self.buffer) >= self.BATCH_SIZE
+            if full or record.levelno >= logging.WARNING or self.closed.is_set():
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        with self.buffer_lock:
+            batch, self.buffer = self.buffer, []
+        if batch:
+            self.enqueue(batch)
+
+    def close(self):
+        self.closed.set()
+        self.flush()
+        super().close()
+
+
+class BatchQueueListener(QueueListener):
+    """
+    逐筆處理 BatchQueueHandler 送來的批次（也接受單筆的 LogRecord）。
+    """
+
+    def handle(self, record):
+        if isinstance(record, list):
+            for item in record:
+                super().handle(item)
+        else:
+            super().handle(record)
+
+    def stop(self):
+        # 可重複呼叫（含程式結束時的 atexit），先送出並關閉此佇列的 handler，
+        # 讓其背景執行緒結束；已停止的監聽器不再由 atexit 保留
+        if self._thread is None:
+            return
+        close_handlers(self.queue)
+        super().stop()
+        atexit.unregister(self.stop)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    限制每個 logger 的 INFO 以下訊息數量（token bucket），
+    例如大量歌曲同時完成時的逐檔訊息；WARNING 以上一律保留。
+    被略過的數量會附在下一則送出的訊息後面。
+    """
+
+    def __init__(self, rate=50, burst=200):
+        """
+        :param rate: 每秒可送出的訊息數。
+        :param burst: 可累積的訊息額度上限。
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.suppressed = 0
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens < 1:
+                self.suppressed += 1
+                return False
+            self.tokens -= 1
+            suppressed, self.suppressed = self.suppressed, 0
+        if suppressed:
+            record.msg = f"{record.getMessage()}（另有 {suppressed} 則訊息已略過）"
+            record.args = None
+        return True
+
+
+def close_handlers(log_queue):
+    # 只處理本行程中寫入該佇列的 handler，其他佇列的 handler 繼續使用
+    for key, handler in list(_handlers.items()):
+        if handler.queue is log_queue:
+            del _handlers[key]
+            handler.close()
+
+
+def _queue_handler(log_queue):
+    key = (os.getpid(), id(log_queue))
+    handler = _handlers.get(key)
+    if handler is None or handler.queue is not log_queue:
+        handler = _handlers[key] = BatchQueueHandler(log_queue)
+    return handler
+
 
 def get_mp_main_logger(
     log_queue=None, name="MainLogger", level=logging.INFO, to_console=True, to_file=None
@@ -13,7 +153,7 @@ def get_mp_main_logger(
       (main_logger, queue_listener, final_queue)
 
     參數：
-      - log_queue: 若已有 multiprocessing.Manager.Queue，直接傳進來；
+      - log_queue: 若已有 multiprocessing.Queue，直接傳進來；
                    若為 None，函式內會自動建立一個新的 Queue。
       - name      : 主程式 logger 名稱 (預設 "MainLogger")
       - level     : 日誌等級 (INFO, DEBUG, 等)
@@ -27,8 +167,11 @@ def get_mp_main_logger(
     """
 
     # 1. 若沒有給 log_queue，就在這裡建立
+    # 一般的 multiprocessing.Queue 由背景執行緒寫入管道，不需經過 Manager 行程往返
     if log_queue is None:
-        log_queue = multiprocessing.Manager().Queue(-1)
+        log_queue = multiprocessing.Queue(-1)
+        # 監聽器停止後才送出的日誌不應讓程式結束時卡住
+        log_queue.cancel_join_thread()
 
     # 2. 準備最終輸出的 handler 列表 (可同時多個)
     handlers = []
@@ -53,17 +196,18 @@ def get_mp_main_logger(
         handlers.append(file_handler)
 
     # 3. 建立 QueueListener，統一負責從 queue 讀 log，再交給 handlers
-    queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_listener = BatchQueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
     queue_listener.start()
+    atexit.register(queue_listener.stop)
 
     # 4. 建立主程式 logger，把自己的 log 也丟到同一個 queue
     main_logger = logging.getLogger(name)
     main_logger.setLevel(level)
     # 先清空可能的舊 handler，避免重複
     main_logger.handlers.clear()
-
-    qhandler = QueueHandler(log_queue)
-    main_logger.addHandler(qhandler)
+    main_logger.addHandler(_queue_handler(log_queue))
 
     return main_logger, queue_listener, log_queue
 
@@ -71,15 +215,19 @@ def get_mp_main_logger(
 def get_mp_child_logger(log_queue, name="ChildLogger", level=logging.INFO):
     """
     讓「子行程」呼叫，從指定的 log_queue 建立一個 logger，
-    再透過 QueueHandler 把日誌丟回 main process 的 QueueListener。
+    再透過 BatchQueueHandler 把日誌丟回 main process 的 QueueListener。
+    同一行程內重複呼叫會直接沿用已設定好的 logger。
 
     回傳：子行程 logger
     """
     child_logger = logging.getLogger(name)
+    handler = _queue_handler(log_queue)
+    if child_logger.handlers == [handler]:
+        return child_logger
     child_logger.setLevel(level)
     # 避免重複
     child_logger.handlers.clear()
-
-    qhandler = QueueHandler(log_queue)
-    child_logger.addHandler(qhandler)
+    child_logger.filters.clear()
+    child_logger.addHandler(handler)
+    child_logger.addFilter(RateLimitFilter())
     return child_logger
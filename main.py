@@ -1,14 +1,70 @@
+import time
+import argparse
 from downloader.MonsterSirenDownloader import MonsterSirenDownloader
 
+
+def progress_printer(interval=2.0):
+    # 每 interval 秒最多輸出一行整體進度
+    last = [0.0]
+
+    def on_progress(snapshot):
+        now = time.monotonic()
+        finished = snapshot["songs_done"] + snapshot["songs_failed"]
+        if now - last[0] < interval and finished < snapshot["songs_total"]:
+            return
+        last[0] = now
+        eta = snapshot["eta"]
+        print(
+            f"[進度] {finished}/{snapshot['songs_total']} 首 "
+            f"({snapshot['fraction'] * 100:.0f}%)，"
+            f"{snapshot['speed'] / 1024 / 1024:.1f} MiB/s，"
+            + (f"剩餘約 {eta:.0f} 秒" if eta is not None else "剩餘時間估算中")
+        )
+
+    return on_progress
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--plan", action="store_true", help="只估算下載量與所需時間，不下載"
+    )
+    parser.add_argument(
+        "--bandwidth", type=float, help="估算用的下載頻寬 (MiB/s)，搭配 --plan"
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, help="在此連接埠提供 Prometheus 格式的 /metrics"
+    )
+    parser.add_argument(
+        "--progress", action="store_true", help="定期輸出整體進度、速度與剩餘時間"
+    )
+    parser.add_argument(
+        "--no-lrc", action="store_true", help="歌詞只寫入標籤，不另存 .lrc 文件"
+    )
+    parser.add_argument("--metrics-json", help="定期把各階段指標的 JSON 快照寫入此檔案")
+    args = parser.parse_args()
+
     # 初始化 MonsterSirenDownloader
-    downloader = MonsterSirenDownloader(max_workers=4)
+    downloader = MonsterSirenDownloader(
+        max_workers=4,
+        metrics_port=args.metrics_port,
+        metrics_path=args.metrics_json,
+        lyrics_sidecar=not args.no_lrc,
+    )
+
+    if args.progress:
+        downloader.progress.subscribe(progress_printer())
 
-    try:
-        print("開始執行下載...")
-        downloader.run()
-    except KeyboardInterrupt:
-        print("檢測到中斷信號，正在停止下載...")
+    if args.plan:
+        bandwidth = args.bandwidth * 1024 * 1024 if args.bandwidth else None
+        downloader.plan(bandwidth=bandwidth)
         downloader.stop()
-    finally:
-        print("下載結束。")
+    else:
+        try:
+            print("開始執行下載...")
+            downloader.run()
+        except KeyboardInterrupt:
+            print("檢測到中斷信號，正在停止下載...")
+            downloader.stop()
+        finally:
+            print("下載結束。")
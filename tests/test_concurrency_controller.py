@@ -0,0 +1,38 @@
+import queue
+import unittest
+
+from downloader.ConcurrencyController import ConcurrencyController
+from downloader.HttpClient import HttpClient
+
+
+class ConcurrencyControllerTest(unittest.TestCase):
+    def make_controller(self):
+        return ConcurrencyController(4, 64, interval=0, log_queue=queue.Queue())
+
+    def saturate(self, controller):
+        # 並行數用滿且吞吐量沒有下降
+        controller.window_peak = controller.limit
+        controller.last_throughput = 0
+        controller.record_bytes(1024)
+
+    def test_slow_start_doubles_until_throttled(self):
+        controller = self.make_controller()
+        for expected in (8, 16, 32):
+            self.saturate(controller)
+            self.assertEqual(controller.limit, expected)
+
+        controller.record_response(429, 0.1)
+        self.assertEqual(controller.limit, 16)
+        self.saturate(controller)
+        self.assertEqual(controller.limit, 17)
+
+    def test_hosts_have_separate_controllers(self):
+        client = HttpClient(log_queue=queue.Queue())
+        api = client.controller("https://api.example.com/api/song/1")
+        cdn = client.controller("https://cdn.example.com/song.wav")
+        self.assertIsNot(api, cdn)
+        self.assertIs(api, client.controller("https://api.example.com/api/albums"))
+
+
+if __name__ == "__main__":
+    unittest.main()
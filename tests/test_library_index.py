@@ -0,0 +1,69 @@
+import queue
+import tempfile
+import unittest
+from pathlib import Path
+
+from downloader.LibraryIndex import LibraryIndex
+from downloader.StateStore import StateStore
+
+
+class LibraryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp.name)
+        self.album_directory = self.directory / "Album"
+        self.album_directory.mkdir()
+        self.state_store = StateStore(self.directory / "state.db")
+
+    def tearDown(self):
+        self.state_store.close()
+        self.temp.cleanup()
+
+    def plan(self, song_name="Song", song_cid="1", tracknumber=1):
+        index = LibraryIndex(self.directory, self.state_store, queue.Queue()).scan()
+        return index.plan_song(self.album_directory, song_name, song_cid, tracknumber)
+
+    def test_untracked_file_is_skipped(self):
+        (self.album_directory / "Song.flac").write_bytes(b"audio")
+        self.assertEqual(
+            self.plan(), (LibraryIndex.SKIP, self.album_directory / "Song.flac")
+        )
+
+    def test_file_interrupted_before_tagging_is_retagged(self):
+        # 轉檔後、寫入標籤前被中斷：文件已改名，但狀態仍是 downloaded
+        (self.album_directory / "Song.flac").write_bytes(b"audio")
+        self.state_store.mark_song("1", "a", "Song", StateStore.DOWNLOADED, size=5)
+        self.assertEqual(
+            self.plan(), (LibraryIndex.RELOCATE, self.album_directory / "Song.flac")
+        )
+
+    def test_failed_song_with_file_is_retagged(self):
+        (self.album_directory / "Song.mp3").write_bytes(b"audio")
+        self.state_store.mark_song("1", "a", "Song", StateStore.FAILED)
+        self.assertEqual(
+            self.plan(), (LibraryIndex.RELOCATE, self.album_directory / "Song.mp3")
+        )
+
+    def test_completed_file_in_renamed_directory_is_relocated(self):
+        # 專輯目錄在磁碟上被改名：依文件大小找回已完成的文件
+        old_directory = self.directory / "Album_old"
+        old_directory.mkdir()
+        (old_directory / "Song.flac").write_bytes(b"audio")
+        self.state_store.mark_song(
+            "1",
+            "a",
+            "Song",
+            StateStore.COMPLETED,
+            path="Album/Song.flac",
+            file_size=5,
+        )
+        self.assertEqual(
+            self.plan(), (LibraryIndex.RELOCATE, old_directory / "Song.flac")
+        )
+
+    def test_missing_file_is_downloaded(self):
+        self.assertEqual(self.plan(), (LibraryIndex.DOWNLOAD, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
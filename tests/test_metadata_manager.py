@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from downloader.MetadataManager import MetadataManager
+
+# 下載時在檔頭預留的空洞大小，與之後接上的音訊資料
+BASE = 4096
+AUDIO = b"\xff\xfb\x90\x64" + os.urandom(8192)
+
+
+def syncsafe(size):
+    return bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+class ParseLrcTest(unittest.TestCase):
+    def test_lines_with_leading_whitespace(self):
+        lrc = "  [00:01.00] first\n\t[00:02.50][00:03.00]second\n [offset:500]\n"
+        self.assertEqual(
+            MetadataManager.parse_lrc(lrc),
+            [("first", 500), ("second", 2000), ("second", 2500)],
+        )
+
+    def test_other_tags_are_skipped(self):
+        lrc = "[ar:artist]\n[ti:title]\n[00:10.00]line\n"
+        self.assertEqual(MetadataManager.parse_lrc(lrc), [("line", 10000)])
+
+
+class ReserveId3SpaceTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp.name) / "song.mp3"
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def reserve(self, content):
+        self.path.write_bytes(b"\x00" * BASE + content)
+        MetadataManager.reserve_id3_space(self.path, BASE)
+        return self.path.read_bytes()
+
+    def test_file_without_tag(self):
+        data = self.reserve(AUDIO)
+        # 空洞變成只有 padding 的 ID3v2.4 標籤，音訊資料原地不動
+        self.assertEqual(data[:10], b"ID3\x04\x00\x00" + syncsafe(BASE - 10))
+        self.assertEqual(data[BASE:], AUDIO)
+
+    def test_existing_tag_is_moved_and_padded(self):
+        from mutagen.id3 import ID3, TIT2
+
+        for version in (3, 4):
+            with self.subTest(version=version):
+                self.path.write_bytes(AUDIO)
+                tag = ID3()
+                tag.add(TIT2(encoding=3, text="title"))
+                tag.save(self.path, v2_version=version, padding=lambda info: 0)
+                original = self.path.read_bytes()
+                tag_size = len(original) - len(AUDIO)
+
+                data = self.reserve(original)
+                self.assertEqual(len(data), BASE + len(original))
+                self.assertEqual(data[3], version)
+                self.assertEqual(data[6:10], syncsafe(tag_size - 10 + BASE))
+                self.assertEqual(data[10:tag_size], original[10:tag_size])
+                self.assertEqual(data[tag_size : tag_size + BASE], b"\x00" * BASE)
+                self.assertEqual(data[tag_size + BASE :], AUDIO)
+                self.assertEqual(ID3(self.path)["TIT2"].text, ["title"])
+
+    def test_tag_with_footer_falls_back_to_copy(self):
+        body = b"TIT2" + syncsafe(6) + b"\x00\x00\x03title"
+        header = b"ID3\x04\x00\x10" + syncsafe(len(body))
+        footer = b"3DI\x04\x00\x10" + syncsafe(len(body))
+        original = header + body + footer + AUDIO
+
+        # v2.4 footer 不允許 padding，只能移除空洞
+        self.assertEqual(self.reserve(original), original)
+        self.assertFalse(self.path.with_name("song.mp3.part").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
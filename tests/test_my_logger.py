@@ -0,0 +1,55 @@
+import gc
+import logging
+import queue
+import threading
+import unittest
+import weakref
+
+from downloader.my_logger import get_mp_child_logger, get_mp_main_logger
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class QueueListenerTest(unittest.TestCase):
+    def start(self):
+        main_logger, listener, log_queue = get_mp_main_logger(
+            log_queue=queue.Queue(), name="test.main", to_console=False
+        )
+        recorder = RecordingHandler()
+        listener.handlers = (recorder,)
+        return listener, log_queue, recorder
+
+    def test_stop_delivers_batched_records(self):
+        listener, log_queue, recorder = self.start()
+        get_mp_child_logger(log_queue, name="test.child").info("batched")
+        listener.stop()
+        self.assertEqual(recorder.messages, ["batched"])
+
+    def test_restarts_do_not_leak_threads_or_listeners(self):
+        existing = set(threading.enumerate())
+        listeners = []
+        for _ in range(5):
+            listener, log_queue, _ = self.start()
+            get_mp_child_logger(log_queue, name="test.child").info("message")
+            listener.stop()
+            listeners.append(weakref.ref(listener))
+            del listener
+
+        # 關閉的 handler 讓背景執行緒立即結束
+        for thread in set(threading.enumerate()) - existing:
+            thread.join(1)
+            self.assertFalse(thread.is_alive())
+        # 已停止的監聽器不再由 atexit 保留
+        gc.collect()
+        self.assertTrue(all(listener() is None for listener in listeners))
+
+
+if __name__ == "__main__":
+    unittest.main()
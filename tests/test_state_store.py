@@ -0,0 +1,28 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from downloader.StateStore import StateStore
+
+
+class StateStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.state_store = StateStore(Path(self.temp.name) / "state.db")
+
+    def tearDown(self):
+        self.state_store.close()
+        self.temp.cleanup()
+
+    def test_failed_batch_is_rolled_back(self):
+        with self.assertRaises(Exception):
+            self.state_store.put_library_tracks([("a", 1, 2, 3), ("b",)])
+        self.assertEqual(self.state_store.library_tracks(), {})
+
+        # 連線沒有停留在未結束的交易中，之後的寫入正常提交
+        self.state_store.put_library_tracks([("a", 1, 2, 3)])
+        self.assertEqual(self.state_store.library_tracks(), {"a": (1, 2, 3)})
+
+
+if __name__ == "__main__":
+    unittest.main()